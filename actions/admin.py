@@ -7,6 +7,9 @@ class ActionAdmin(admin.ModelAdmin):
     list_display = ['id', 'video', 'player', 'type', 'start_time', 'end_time', 'confidence', 'is_successful']
     list_filter = ['type', 'model_type', 'is_successful', 'created_at']
     search_fields = ['video__user__username', 'player__jersey_number', 'type']
+    list_select_related = ('video__user', 'player__video')
+    list_per_page = 50
+    show_full_result_count = False
     
     fieldsets = (
         ('Basic Information', {
@@ -25,6 +28,3 @@ class ActionAdmin(admin.ModelAdmin):
             'fields': ('segment_path',)
         })
     )
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('video', 'player') 
\ No newline at end of file
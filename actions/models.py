@@ -4,6 +4,12 @@ from players.models import Player
 from core.models import BaseModel
 
 
+SHOOTING_ACTION_TYPES = ('shot_2pt', 'shot_3pt', 'free_throw', 'dunk', 'layup')
+MAX_ACTION_DURATION = 30  # seconds
+# Check constraints enforcing the action timing rules
+ACTION_TIMING_CONSTRAINTS = ('action_time_ordered', 'action_duration_max')
+
+
 class Action(models.Model):
     ACTION_TYPES = [
         # Shooting actions
@@ -74,6 +80,28 @@ class Action(models.Model):
             models.Index(fields=['video', 'type']),
             models.Index(fields=['player', 'type']),
             models.Index(fields=['start_time', 'end_time']),
+            models.Index(fields=['video', 'start_time']),
+            models.Index(fields=['video', 'type', 'is_successful']),
+            models.Index(
+                fields=['video', 'confidence'],
+                name='action_highconf_idx',
+                condition=models.Q(confidence__gte=0.5)
+            ),
+            models.Index(
+                fields=['video', 'is_successful'],
+                name='action_shot_idx',
+                condition=models.Q(type__in=SHOOTING_ACTION_TYPES)
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(end_time__gt=models.F('start_time')),
+                name='action_time_ordered'
+            ),
+            models.CheckConstraint(
+                check=models.Q(end_time__lte=models.F('start_time') + MAX_ACTION_DURATION),
+                name='action_duration_max'
+            ),
         ]
         
     def __str__(self):
@@ -85,7 +113,7 @@ class Action(models.Model):
         return self.end_time - self.start_time
     
     def is_shooting_action(self):
-        return self.type in ['shot_2pt', 'shot_3pt', 'free_throw', 'dunk', 'layup']
+        return self.type in SHOOTING_ACTION_TYPES
     
     def is_ball_handling_action(self):
         return self.type in ['dribble', 'pass', 'steal', 'turnover'] 
\ No newline at end of file
@@ -1,8 +1,23 @@
+from django.db import IntegrityError
 from rest_framework import serializers
-from .models import Action
+from .models import Action, ACTION_TIMING_CONSTRAINTS, MAX_ACTION_DURATION
 from players.serializers import PlayerListSerializer
 
 
+def validate_action_timing(start_time, end_time):
+    """Same rules as the action_time_ordered / action_duration_max check constraints"""
+    if start_time >= end_time:
+        raise serializers.ValidationError("End time must be after start time")
+    
+    if end_time - start_time > MAX_ACTION_DURATION:
+        raise serializers.ValidationError(f"Action duration cannot exceed {MAX_ACTION_DURATION} seconds")
+
+
+def _is_timing_violation(error):
+    """Whether an IntegrityError comes from one of the action timing check constraints"""
+    return any(name in str(error) for name in ACTION_TIMING_CONSTRAINTS)
+
+
 class ActionSerializer(serializers.ModelSerializer):
     """Serializer for Action model"""
     player = PlayerListSerializer(read_only=True)
@@ -18,10 +33,34 @@ class ActionSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'id', 'duration', 'model_type', 'confidence', 'segment_path', 'metadata', 'created_at'
         ]
+    
+    def validate(self, data):
+        """Validate timing, taking unchanged times from the instance on partial updates"""
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time is not None and end_time is not None:
+            validate_action_timing(start_time, end_time)
+        return data
+    
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except IntegrityError as e:
+            if not _is_timing_violation(e):
+                raise
+            raise serializers.ValidationError("Invalid action timing")
+
+
+# Columns read by ActionListSerializer
+ACTION_LIST_FIELDS = (
+    'id', 'type', 'start_time', 'end_time', 'is_successful', 'confidence',
+    'player', 'player__jersey_number'
+)
 
 
 class ActionListSerializer(serializers.ModelSerializer):
     """Simplified serializer for listing actions"""
+    player_id = serializers.IntegerField(read_only=True)
     player_jersey = serializers.CharField(source='player.jersey_number', read_only=True)
     duration = serializers.ReadOnlyField()
     
@@ -29,7 +68,7 @@ class ActionListSerializer(serializers.ModelSerializer):
         model = Action
         fields = [
             'id', 'type', 'start_time', 'end_time', 'duration', 'is_successful', 
-            'confidence', 'player_jersey'
+            'confidence', 'player_id', 'player_jersey'
         ]
 
 
@@ -44,19 +83,19 @@ class ActionCreateSerializer(serializers.ModelSerializer):
     
     def validate(self, data):
         """Validate action data"""
-        if data['start_time'] >= data['end_time']:
-            raise serializers.ValidationError("End time must be after start time")
-        
-        if data['end_time'] - data['start_time'] > 30:  # Max 30 seconds for single action
-            raise serializers.ValidationError("Action duration cannot exceed 30 seconds")
-        
+        validate_action_timing(data['start_time'], data['end_time'])
         return data
     
     def create(self, validated_data):
         # Set default values for manual annotations
         validated_data['model_type'] = 'manual_annotation'
         validated_data['confidence'] = 1.0
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except IntegrityError as e:
+            if not _is_timing_violation(e):
+                raise
+            raise serializers.ValidationError("Invalid action timing")
 
 
 class ActionFilterSerializer(serializers.Serializer):
@@ -4,15 +4,19 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import Avg, Count, Q
 
-from .models import Action
+from .models import Action, SHOOTING_ACTION_TYPES
 from videos.models import Video
 from .serializers import (
     ActionSerializer, ActionListSerializer, ActionCreateSerializer,
-    ActionFilterSerializer, ActionInferenceSerializer
+    ActionFilterSerializer, ActionInferenceSerializer, ACTION_LIST_FIELDS
 )
-from core.tasks import detect_actions_with_mmaction
+from core.tasks import action_recognition_pipeline
+
+ACTION_TYPES_PAYLOAD = {
+    'action_types': [{'value': value, 'label': label} for value, label in Action.ACTION_TYPES]
+}
 
 
 class ActionViewSet(viewsets.ModelViewSet):
@@ -22,29 +26,32 @@ class ActionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['type', 'is_successful', 'model_type']
     
     def get_queryset(self):
-        queryset = Action.objects.filter(video__user=self.request.user)
+        filters = {'video__user': self.request.user}
         
         # Apply custom filters
         video_id = self.request.query_params.get('video')
         if video_id:
-            queryset = queryset.filter(video__id=video_id)
+            filters['video_id'] = video_id
         
         player_id = self.request.query_params.get('player')
         if player_id:
-            queryset = queryset.filter(player__id=player_id)
+            filters['player_id'] = player_id
         
         min_confidence = self.request.query_params.get('min_confidence')
         if min_confidence:
             try:
-                queryset = queryset.filter(confidence__gte=float(min_confidence))
+                filters['confidence__gte'] = float(min_confidence)
             except ValueError:
                 pass
         
         action_type = self.request.query_params.get('type')
         if action_type:
-            queryset = queryset.filter(type=action_type)
+            filters['type'] = action_type
         
-        return queryset.select_related('video', 'player').order_by('video', 'start_time')
+        queryset = Action.objects.filter(**filters).order_by('video', 'start_time')
+        if self.action == 'list':
+            return queryset.select_related('player').only(*ACTION_LIST_FIELDS)
+        return queryset.select_related('video', 'player')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -77,12 +84,12 @@ class ActionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Start action detection task
-        detect_actions_with_mmaction.delay(
+        # Start action detection, followed by stats and highlights
+        action_recognition_pipeline(
             str(video.id), 
             model_type, 
             confidence_threshold
-        )
+        ).apply_async()
         
         return Response({
             'message': 'Action inference started',
@@ -94,10 +101,7 @@ class ActionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def types(self, request):
         """Get available action types"""
-        return Response({
-            'action_types': [{'value': choice[0], 'label': choice[1]} 
-                           for choice in Action.ACTION_TYPES]
-        })
+        return Response(ACTION_TYPES_PAYLOAD)
     
     @action(detail=False, methods=['get'])
     def summary(self, request):
@@ -119,52 +123,51 @@ class ActionViewSet(viewsets.ModelViewSet):
         
         # Generate summary statistics
         actions = Action.objects.filter(video=video)
+        totals = actions.aggregate(
+            total=Count('id'),
+            avg_conf=Avg('confidence'),
+            shooting_total=Count('id', filter=Q(type__in=SHOOTING_ACTION_TYPES)),
+            shooting_successful=Count(
+                'id', filter=Q(type__in=SHOOTING_ACTION_TYPES, is_successful=True)
+            )
+        )
         
         summary = {
-            'total_actions': actions.count(),
+            'total_actions': totals['total'],
             'action_breakdown': {},
             'player_breakdown': {},
             'success_rate': {},
-            'avg_confidence': 0
+            'avg_confidence': totals['avg_conf'] or 0
         }
         
-        # Action type breakdown
+        # Action type breakdown, keyed in Action.ACTION_TYPES order
+        type_counts = dict(actions.values_list('type').annotate(count=Count('id')).order_by())
         for action_type, label in Action.ACTION_TYPES:
-            count = actions.filter(type=action_type).count()
-            if count > 0:
+            if type_counts.get(action_type):
                 summary['action_breakdown'][action_type] = {
-                    'count': count,
+                    'count': type_counts[action_type],
                     'label': label
                 }
         
         # Player breakdown
-        for action in actions.select_related('player'):
-            if action.player:
-                player_key = f"Player {action.player.jersey_number}"
-                if player_key not in summary['player_breakdown']:
-                    summary['player_breakdown'][player_key] = 0
-                summary['player_breakdown'][player_key] += 1
+        player_counts = (
+            actions.filter(player__isnull=False)
+            .values('player__jersey_number')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        summary['player_breakdown'] = {
+            f"Player {row['player__jersey_number']}": row['count'] for row in player_counts
+        }
         
         # Success rate for shooting actions
-        shooting_actions = actions.filter(
-            type__in=['shot_2pt', 'shot_3pt', 'free_throw', 'dunk', 'layup']
-        )
-        if shooting_actions.exists():
-            successful_shots = shooting_actions.filter(is_successful=True).count()
-            total_shots = shooting_actions.count()
+        if totals['shooting_total'] > 0:
             summary['success_rate']['shooting'] = {
-                'successful': successful_shots,
-                'total': total_shots,
-                'percentage': (successful_shots / total_shots * 100) if total_shots > 0 else 0
+                'successful': totals['shooting_successful'],
+                'total': totals['shooting_total'],
+                'percentage': totals['shooting_successful'] / totals['shooting_total'] * 100
             }
         
-        # Average confidence
-        if actions.exists():
-            from django.db import models
-            summary['avg_confidence'] = actions.aggregate(
-                avg_conf=models.Avg('confidence')
-            )['avg_conf'] or 0
-        
         return Response(summary)
 
 
@@ -183,7 +186,7 @@ class ActionListView(generics.ListAPIView):
         if video_id:
             queryset = queryset.filter(video__id=video_id)
         
-        return queryset.select_related('video', 'player').order_by('start_time')
+        return queryset.select_related('player').only(*ACTION_LIST_FIELDS).order_by('start_time')
 
 
 class ActionDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -192,7 +195,7 @@ class ActionDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Action.objects.filter(video__user=self.request.user)
+        return Action.objects.filter(video__user=self.request.user).select_related('video', 'player')
 
 
 class ActionCreateView(generics.CreateAPIView):
@@ -203,7 +206,7 @@ class ActionCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         # Ensure user owns the video
         video = serializer.validated_data['video']
-        if video.user != self.request.user:
+        if video.user_id != self.request.user.id:
             raise PermissionError("You don't have permission to add actions to this video")
         
         serializer.save() 
\ No newline at end of file
@@ -19,6 +19,9 @@ class UserAdmin(BaseUserAdmin):
     
     list_display = ['username', 'email', 'first_name', 'last_name', 'get_user_type', 'is_staff', 'date_joined']
     list_filter = ['is_staff', 'is_superuser', 'is_active', 'date_joined', 'profile__user_type']
+    list_select_related = ('profile',)
+    list_per_page = 50
+    show_full_result_count = False
     
     def get_user_type(self, obj):
         return obj.profile.user_type if hasattr(obj, 'profile') else 'No Profile'
@@ -29,4 +32,7 @@ class UserAdmin(BaseUserAdmin):
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'user_type', 'phone_number', 'is_profile_public', 'created_at']
     list_filter = ['user_type', 'is_profile_public', 'allow_notifications', 'created_at']
-    search_fields = ['user__username', 'user__email', 'phone_number'] 
\ No newline at end of file
+    search_fields = ['user__username', 'user__email', 'phone_number']
+    list_select_related = ('user',)
+    list_per_page = 50
+    show_full_result_count = False 
\ No newline at end of file
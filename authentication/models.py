@@ -43,7 +43,7 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, created, **kwargs):
     """Save user profile when user is saved"""
-    if hasattr(instance, 'profile'):
+    if not created and hasattr(instance, 'profile'):
         instance.profile.save() 
\ No newline at end of file
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import UserProfile
 
 
@@ -30,9 +31,10 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             **validated_data
         )
         
-        # Update user profile with user_type
-        user.profile.user_type = user_type
-        user.profile.save()
+        # Update user profile with user_type (the signal already created it)
+        if user.profile.user_type != user_type:
+            UserProfile.objects.filter(user=user).update(user_type=user_type)
+            user.profile.user_type = user_type
         
         return user
 
@@ -92,6 +94,16 @@ class TokenSerializer(serializers.Serializer):
     user = UserSerializer(read_only=True)
 
 
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """JWT token obtain serializer that includes user data"""
+    
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # self.user is the instance already authenticated by the parent serializer
+        data['user'] = UserSerializer(self.user).data
+        return data
+
+
 class PasswordChangeSerializer(serializers.Serializer):
     """Serializer for password change"""
     old_password = serializers.CharField(write_only=True)
@@ -10,7 +10,8 @@ from django.contrib.auth import authenticate
 from .models import UserProfile
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserSerializer,
-    UserProfileSerializer, TokenSerializer, PasswordChangeSerializer
+    UserProfileSerializer, TokenSerializer, PasswordChangeSerializer,
+    CustomTokenObtainPairSerializer
 )
 
 
@@ -74,8 +75,12 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
-        profile, created = UserProfile.objects.get_or_create(user=self.request.user)
-        return profile
+        try:
+            return self.request.user.profile
+        except UserProfile.DoesNotExist:
+            # Users created before the profile signal existed
+            profile, created = UserProfile.objects.get_or_create(user=self.request.user)
+            return profile
 
 
 class UserDetailView(generics.RetrieveUpdateAPIView):
@@ -140,18 +145,4 @@ def health_check(request):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     """Custom JWT token obtain view with user data"""
-    
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        
-        if response.status_code == 200:
-            # Get user data
-            username = request.data.get('username')
-            try:
-                user = User.objects.get(username=username)
-                user_serializer = UserSerializer(user)
-                response.data['user'] = user_serializer.data
-            except User.DoesNotExist:
-                pass
-        
-        return response 
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
@@ -115,6 +115,7 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+HIGHLIGHT_CDN_PREFIX = config('HIGHLIGHT_CDN_PREFIX', default='')  # e.g. https://cdn.example.com/media
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -132,10 +133,17 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'drf_orjson_renderer.renderers.ORJSONRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
 
+# Browsable API only in development
+if DEBUG:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('rest_framework.renderers.BrowsableAPIRenderer')
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -156,6 +164,14 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'flush-highlight-view-counts': {
+        'task': 'core.tasks.flush_highlight_view_counts',
+        'schedule': 30.0,  # seconds
+    },
+}
+HIGHLIGHT_COUNTER_REDIS_URL = config('HIGHLIGHT_COUNTER_REDIS_URL', default=CELERY_BROKER_URL)
+HIGHLIGHT_COUNTER_REDIS_TIMEOUT = 0.1  # seconds, connect/read timeout before a view is written to the DB directly
 
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
@@ -165,11 +181,16 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 VIDEO_SEGMENT_LENGTH = 3  # seconds
 MAX_VIDEO_DURATION = 3600  # 1 hour
 SUPPORTED_VIDEO_FORMATS = ['mp4', 'avi', 'mov', 'mkv']
+YOLO_BATCH_SIZE = 16  # sampled frames per YOLO forward pass
+YOLO_IMAGE_SIZE = 640  # YOLO inference resolution
+DECODE_PREFETCH_FRAMES = 64  # decoded frames buffered ahead of YOLO
+HIGHLIGHT_KEYFRAME_SNAP = 0.5  # max seconds a highlight cut may move back to a keyframe to allow stream copy
 
 # ML Model paths
 MMACTION2_CONFIG_PATH = config('MMACTION2_CONFIG_PATH', default='configs/recognition/tsn/tsn_r50_video_inference_1x1x3_100e_kinetics400_rgb.py')
 MMACTION2_CHECKPOINT_PATH = config('MMACTION2_CHECKPOINT_PATH', default='checkpoints/tsn_r50_1x1x3_100e_kinetics400_rgb_20200614-e508be42.pth')
 YOLO_MODEL_PATH = config('YOLO_MODEL_PATH', default='models/yolov8n.pt')
+MMACTION2_BATCH_SIZE = 8  # video segments per recognizer forward pass
 
 # Logging
 LOGGING = {
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Export the YOLO weights to a TensorRT engine for player detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('weights', nargs='?', help='Path to the .pt weights (defaults to YOLO_MODEL_PATH)')
+        parser.add_argument('--int8', action='store_true', help='Build an INT8 engine instead of FP16')
+        parser.add_argument('--data', help='Calibration dataset YAML, required with --int8')
+        parser.add_argument('--device', default=0, help='CUDA device to build the engine on')
+
+    def handle(self, *args, **options):
+        try:
+            from ultralytics import YOLO
+        except ImportError:
+            raise CommandError('ultralytics is not installed')
+
+        weights = options['weights'] or settings.YOLO_MODEL_PATH
+        if not weights.endswith('.pt'):
+            raise CommandError(f'Expected PyTorch .pt weights, got {weights}')
+        if options['int8'] and not options['data']:
+            raise CommandError('--data is required for INT8 calibration')
+
+        # Dynamic batch up to YOLO_BATCH_SIZE so batched inference in
+        # detect_players_task runs on the engine's batch dimension
+        export_kwargs = {
+            'format': 'engine',
+            'imgsz': getattr(settings, 'YOLO_IMAGE_SIZE', 640),
+            'batch': getattr(settings, 'YOLO_BATCH_SIZE', 16),
+            'dynamic': True,
+            'device': options['device'],
+        }
+        if options['int8']:
+            export_kwargs.update(int8=True, data=options['data'])
+        else:
+            export_kwargs['half'] = True
+
+        engine_path = YOLO(weights).export(**export_kwargs)
+        self.stdout.write(self.style.SUCCESS(f'Exported {engine_path}'))
+        self.stdout.write(f'Set YOLO_MODEL_PATH={engine_path} to use it')
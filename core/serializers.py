@@ -0,0 +1,22 @@
+import copy
+
+from rest_framework import serializers
+
+
+class CachedFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that builds its field set once per class
+    Model introspection in get_fields() runs on first use; later instances get
+    fresh copies of the cached fields (Field.__deepcopy__ re-instantiates from
+    the constructor arguments, so nested and many=True serializers stay unbound)
+    """
+    _fields_cache = {}
+    
+    def get_fields(self):
+        cls = type(self)
+        if cls not in CachedFieldsModelSerializer._fields_cache:
+            CachedFieldsModelSerializer._fields_cache[cls] = super().get_fields()
+        return {
+            name: copy.deepcopy(field)
+            for name, field in CachedFieldsModelSerializer._fields_cache[cls].items()
+        }
@@ -2,28 +2,115 @@ import os
 import cv2
 import numpy as np
 import pandas as pd
-from celery import shared_task
+from celery import chain, chord, shared_task
+from celery.signals import worker_process_init
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
-from moviepy.editor import VideoFileClip, concatenate_videoclips
 import logging
 
 # ML imports
 try:
-    from mmaction.apis import init_recognizer, inference_recognizer
+    from mmaction.apis import init_recognizer
+    from mmengine.dataset import Compose, pseudo_collate
+    from mmengine.registry import init_default_scope
     from ultralytics import YOLO
     import torch
+    
+    # Inference input shapes are fixed, so let cuDNN pick the fastest kernels once
+    torch.backends.cudnn.benchmark = True
+    torch.set_float32_matmul_precision('high')
 except ImportError as e:
     logging.warning(f"ML libraries not available: {e}")
 
 from videos.models import Video
 from players.models import Player
 from actions.models import Action
-from highlights.models import Highlight
+from highlights.counters import ack_view_counts, pop_view_counts
+from highlights.models import Highlight, apply_view_counts
 from stats.models import Stats
+from core.utils import (
+    open_video_capture, iter_sampled_frames, iter_segment_frames, concat_video_segments, prefetch,
+    PlayerTracks, extract_video_metadata
+)
 
 logger = logging.getLogger(__name__)
 
+# Action type -> (counted Stats field, Stats field also counted when successful)
+STATS_FIELDS_BY_ACTION_TYPE = {
+    'shot_2pt': ('fga_2pt', 'fgm_2pt'),
+    'shot_3pt': ('fga_3pt', 'fgm_3pt'),
+    'free_throw': ('fta', 'ftm'),
+    'assist': ('assists', None),
+    'rebound_offensive': ('offensive_rebounds', None),
+    'rebound_defensive': ('defensive_rebounds', None),
+    'steal': ('steals', None),
+    'block': ('blocks', None),
+    'turnover': ('turnovers', None),
+    'foul': ('fouls', None),
+}
+
+# ML models loaded in this worker process, keyed by their load arguments
+_MODEL_CACHE = {}
+
+
+def _get_yolo_model(model_path):
+    """Return a cached YOLO model, loading it on first use"""
+    key = ('yolo', model_path)
+    if key not in _MODEL_CACHE:
+        _MODEL_CACHE[key] = YOLO(model_path)
+    return _MODEL_CACHE[key]
+
+
+def _get_recognizer(config_path, checkpoint_path, device='cpu'):
+    """Return a cached mmaction2 recognizer, loading it on first use"""
+    key = ('mmaction', config_path, checkpoint_path, device)
+    if key not in _MODEL_CACHE:
+        _MODEL_CACHE[key] = init_recognizer(config_path, checkpoint_path, device=device)
+    return _MODEL_CACHE[key]
+
+
+def clear_model_cache():
+    """Drop all cached models in this process (e.g. under memory pressure)"""
+    _MODEL_CACHE.clear()
+
+
+def _set_video_status(video_id, status, **fields):
+    """Update a video's processing status (and any extra fields) in a single UPDATE"""
+    Video.objects.filter(id=video_id).update(status=status, **fields)
+
+
+@worker_process_init.connect
+def preload_models(**kwargs):
+    """Load the YOLO model once when a Celery worker process starts"""
+    try:
+        _get_yolo_model(getattr(settings, 'YOLO_MODEL_PATH', 'yolov8n.pt'))
+    except Exception as e:
+        logger.warning(f"Could not preload YOLO model: {str(e)}")
+
+
+@shared_task(bind=True)
+def extract_metadata_task(self, video_id):
+    """
+    Read duration, fps and resolution of an uploaded video
+    """
+    try:
+        video = Video.objects.only('id', 'file').get(id=video_id)
+        metadata = extract_video_metadata(video.file.path)
+        if metadata:
+            Video.objects.filter(id=video_id).update(**metadata)
+        return {"status": "completed", "video_id": video_id}
+        
+    except Video.DoesNotExist:
+        logger.error(f"Video {video_id} not found")
+        return {"status": "error", "message": "Video not found"}
+    
+    except Exception as e:
+        logger.error(f"Error extracting metadata for video {video_id}: {str(e)}")
+        _set_video_status(video_id, 'error', error_message=f"Failed to extract metadata: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
 
 @shared_task(bind=True)
 def process_video_task(self, video_id):
@@ -32,17 +119,18 @@ def process_video_task(self, video_id):
     Orchestrates the complete video analysis workflow
     """
     try:
-        video = Video.objects.get(id=video_id)
-        video.status = 'processing'
-        video.processing_started_at = timezone.now()
-        video.save()
+        video = Video.objects.only('id').get(id=video_id)
+        _set_video_status(video.id, 'processing', processing_started_at=timezone.now())
         
         logger.info(f"Starting video processing for video {video_id}")
         
-        # Step 1: Player detection
-        detect_players_task.delay(str(video.id))
+        # Run the pipeline as one chain so a failed step stops the rest
+        chain(
+            detect_players_task.si(str(video.id)),
+            analyze_ball_and_score_task.si(str(video.id)),
+            action_recognition_pipeline(str(video.id), 'mmaction2_tsn', 0.5)
+        ).apply_async()
         
-        # Subsequent steps will be triggered by each task completion
         return {"status": "started", "video_id": str(video.id)}
         
     except Video.DoesNotExist:
@@ -51,10 +139,7 @@ def process_video_task(self, video_id):
     
     except Exception as e:
         logger.error(f"Error processing video {video_id}: {str(e)}")
-        video = Video.objects.get(id=video_id)
-        video.status = 'error'
-        video.error_message = str(e)
-        video.save()
+        _set_video_status(video_id, 'error', error_message=str(e))
         return {"status": "error", "message": str(e)}
 
 
@@ -71,88 +156,73 @@ def detect_players_task(self, video_id):
         
         # Initialize YOLO model
         model_path = getattr(settings, 'YOLO_MODEL_PATH', 'yolov8n.pt')
-        model = YOLO(model_path)
+        model = _get_yolo_model(model_path)
         
-        # Open video
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Open video (hardware decode when available)
+        cap = open_video_capture(video_path)
         
         # Player tracking data
-        player_tracks = {}
-        frame_idx = 0
-        
-        # Process video frames
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Run YOLO detection every 30 frames (roughly 1 second)
-            if frame_idx % 30 == 0:
-                results = model(frame)
-                
-                # Process detections
-                for result in results:
-                    boxes = result.boxes
-                    if boxes is not None:
-                        for box in boxes:
-                            # Filter for person class (class 0 in COCO)
-                            if int(box.cls) == 0 and float(box.conf) > 0.5:
-                                # Extract bounding box
-                                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                                conf = float(box.conf)
-                                
-                                # Simple tracking by area overlap
-                                track_id = len(player_tracks)
-                                player_tracks[track_id] = {
-                                    'bbox_history': [(x1, y1, x2, y2)],
-                                    'confidence_history': [conf],
-                                    'frame_indices': [frame_idx]
-                                }
+        player_tracks = PlayerTracks()
+        
+        # Sampled frames are run through YOLO in batches
+        batch_size = getattr(settings, 'YOLO_BATCH_SIZE', 16)
+        # Frames are letterboxed to this size (FP16 on GPU)
+        image_size = getattr(settings, 'YOLO_IMAGE_SIZE', 640)
+        batch_frames = []
+        batch_indices = []
+        
+        # Run YOLO detection every 30 frames (roughly 1 second),
+        # decoding ahead on a background thread while the model runs
+        prefetch_size = getattr(settings, 'DECODE_PREFETCH_FRAMES', 64)
+        for frame_idx, frame in prefetch(iter_sampled_frames(cap, 30), prefetch_size):
+            batch_frames.append(frame)
+            batch_indices.append(frame_idx)
             
-            frame_idx += 1
+            if len(batch_frames) == batch_size:
+                with torch.inference_mode():
+                    results = model(batch_frames, imgsz=image_size, half=True, verbose=False)
+                _track_player_detections(results, batch_indices, player_tracks)
+                batch_frames, batch_indices = [], []
+        
+        # Flush the last partial batch
+        if batch_frames:
+            with torch.inference_mode():
+                results = model(batch_frames, imgsz=image_size, half=True, verbose=False)
+            _track_player_detections(results, batch_indices, player_tracks)
         
         cap.release()
         
         # Create Player objects from tracks
-        for track_id, track_data in player_tracks.items():
-            if len(track_data['frame_indices']) > 10:  # Minimum appearances
-                avg_confidence = np.mean(track_data['confidence_history'])
-                avg_bbox_area = np.mean([
-                    (x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in track_data['bbox_history']
-                ])
-                
-                # Determine team color (simplified - could be enhanced)
-                team_color = 'red' if track_id % 2 == 0 else 'blue'
-                
-                Player.objects.create(
-                    video=video,
-                    jersey_number=str(track_id + 1),  # Simple numbering
-                    team_color=team_color,
-                    player_id_model=f"track_{track_id}",
-                    detection_confidence=avg_confidence,
-                    avg_bbox_area=avg_bbox_area
-                )
+        counts, avg_confidences, avg_bbox_areas = player_tracks.summary()
+        players = []
+        for track_id in np.flatnonzero(counts > 10):  # Minimum appearances
+            track_id = int(track_id)
+            
+            # Determine team color (simplified - could be enhanced)
+            team_color = 'red' if track_id % 2 == 0 else 'blue'
+            
+            players.append(Player(
+                video=video,
+                jersey_number=str(track_id + 1),  # Simple numbering
+                team_color=team_color,
+                player_id_model=f"track_{track_id}",
+                detection_confidence=float(avg_confidences[track_id]),
+                avg_bbox_area=float(avg_bbox_areas[track_id])
+            ))
         
-        # Update video status
-        video.status = 'players_detected'
-        video.save()
+        Player.objects.bulk_create(players, batch_size=500)
         
-        logger.info(f"Player detection completed for video {video_id}. Found {len(player_tracks)} players")
+        # Update video status
+        _set_video_status(video.id, 'players_detected')
         
-        # Trigger next step: ball localization and score analysis
-        analyze_ball_and_score_task.delay(str(video.id))
+        logger.info(f"Player detection completed for video {video_id}. Found {player_tracks.num_tracks} players")
         
-        return {"status": "completed", "players_detected": len(player_tracks)}
+        return {"status": "completed", "players_detected": player_tracks.num_tracks}
         
     except Exception as e:
         logger.error(f"Error in player detection for video {video_id}: {str(e)}")
-        video = Video.objects.get(id=video_id)
-        video.status = 'error'
-        video.error_message = f"Player detection failed: {str(e)}"
-        video.save()
-        return {"status": "error", "message": str(e)}
+        _set_video_status(video_id, 'error', error_message=f"Player detection failed: {str(e)}")
+        raise
 
 
 @shared_task(bind=True)
@@ -161,7 +231,6 @@ def analyze_ball_and_score_task(self, video_id):
     Analyze ball localization and score tracking
     """
     try:
-        video = Video.objects.get(id=video_id)
         logger.info(f"Starting ball and score analysis for video {video_id}")
         
         # This is a placeholder for ball tracking implementation
@@ -172,21 +241,14 @@ def analyze_ball_and_score_task(self, video_id):
         # 4. Associate scores with players
         
         # For now, we'll simulate the process
-        video.status = 'ball_analyzed'
-        video.save()
-        
-        # Trigger action detection
-        detect_actions_with_mmaction.delay(str(video.id), 'mmaction2_tsn', 0.5)
+        _set_video_status(video_id, 'ball_analyzed')
         
         return {"status": "completed"}
         
     except Exception as e:
         logger.error(f"Error in ball analysis for video {video_id}: {str(e)}")
-        video = Video.objects.get(id=video_id)
-        video.status = 'error'
-        video.error_message = f"Ball analysis failed: {str(e)}"
-        video.save()
-        return {"status": "error", "message": str(e)}
+        _set_video_status(video_id, 'error', error_message=f"Ball analysis failed: {str(e)}")
+        raise
 
 
 @shared_task(bind=True)
@@ -207,88 +269,70 @@ def detect_actions_with_mmaction(self, video_id, model_type='mmaction2_tsn', con
         if not config_path or not checkpoint_path:
             raise Exception("MMAction2 model paths not configured")
         
-        # Initialize recognizer
-        model = init_recognizer(config_path, checkpoint_path, device='cpu')
+        # Initialize recognizer (GPU when available, run in FP16 there)
+        device = 'cuda:0' if torch.cuda.is_available() else 'cpu'
+        model = _get_recognizer(config_path, checkpoint_path, device=device)
         
-        # Segment video into clips
+        # Segments are decoded in memory and run through the recognizer in batches
+        test_pipeline, clip_len, num_clips = _build_frame_pipeline(model)
+        batch_size = getattr(settings, 'MMACTION2_BATCH_SIZE', 8)
         segment_length = getattr(settings, 'VIDEO_SEGMENT_LENGTH', 3)  # 3 seconds
-        clip = VideoFileClip(video_path)
-        duration = clip.duration
         
-        actions_created = 0
+        cap = open_video_capture(video_path)
+        # Prefer the properties stored at upload over re-reading the container
+        fps = video.fps or cap.get(cv2.CAP_PROP_FPS)
+        duration = video.duration or (cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps > 0 else 0)
+        segments = iter_segment_frames(cap, fps, duration, segment_length, clip_len * num_clips)
+        # Decode the next batches while the current one is on the recognizer
+        segments = prefetch(segments, batch_size * 2)
         
-        # Process video in segments
-        for start_time in range(0, int(duration), segment_length):
-            end_time = min(start_time + segment_length, duration)
-            
-            # Extract segment
-            segment = clip.subclip(start_time, end_time)
-            segment_path = f'/tmp/segment_{video_id}_{start_time}.mp4'
-            segment.write_videofile(segment_path, verbose=False, logger=None)
-            
+        # Try to associate actions with a player (simplified)
+        player = Player.objects.filter(video=video).first()
+        actions = []
+        
+        # Process video in batches of segments
+        for batch in _batched(segments, batch_size):
             try:
-                # Run inference
-                results = inference_recognizer(model, segment_path)
-                
-                # Process results
-                for result in results:
-                    # Extract top prediction
-                    if hasattr(result, 'pred_scores'):
-                        scores = result.pred_scores.cpu().numpy()
-                        labels = result.pred_labels.cpu().numpy()
-                        
-                        top_idx = np.argmax(scores)
-                        confidence = scores[top_idx]
-                        label_idx = labels[top_idx]
-                        
-                        if confidence > confidence_threshold:
-                            # Map label to action type (simplified mapping)
-                            action_type = _map_mmaction_label_to_action_type(label_idx)
-                            
-                            if action_type:
-                                # Try to associate with a player (simplified)
-                                players = Player.objects.filter(video=video)
-                                player = players.first() if players.exists() else None
-                                
-                                Action.objects.create(
-                                    video=video,
-                                    player=player,
-                                    type=action_type,
-                                    start_time=start_time,
-                                    end_time=end_time,
-                                    model_type=model_type,
-                                    confidence=confidence,
-                                    metadata={'mmaction_label': int(label_idx)}
-                                )
-                                actions_created += 1
-                
-                # Clean up segment file
-                os.remove(segment_path)
-                
+                predictions = _recognize_segments(
+                    model, test_pipeline, [frames for _, _, frames in batch], clip_len, num_clips
+                )
             except Exception as e:
-                logger.warning(f"Error processing segment {start_time}-{end_time}: {str(e)}")
+                logger.warning(f"Error processing segments {batch[0][0]}-{batch[-1][1]}: {str(e)}")
                 continue
+            
+            for (start_time, end_time, _), (label_idx, confidence) in zip(batch, predictions):
+                if confidence > confidence_threshold:
+                    # Map label to action type (simplified mapping)
+                    action_type = _map_mmaction_label_to_action_type(label_idx)
+                    
+                    if action_type:
+                        actions.append(Action(
+                            video=video,
+                            player=player,
+                            type=action_type,
+                            start_time=start_time,
+                            end_time=end_time,
+                            model_type=model_type,
+                            confidence=confidence,
+                            metadata={'mmaction_label': int(label_idx)}
+                        ))
+        
+        cap.release()
         
-        clip.close()
+        Action.objects.bulk_create(actions, batch_size=500)
+        actions_created = len(actions)
         
         # Update video status
-        video.status = 'actions_done'
-        video.save()
+        _set_video_status(video.id, 'actions_done')
         
         logger.info(f"Action detection completed for video {video_id}. Created {actions_created} actions")
         
-        # Trigger stats calculation
-        calculate_stats_task.delay(str(video.id))
-        
         return {"status": "completed", "actions_created": actions_created}
         
     except Exception as e:
         logger.error(f"Error in action detection for video {video_id}: {str(e)}")
-        video = Video.objects.get(id=video_id)
-        video.status = 'error'
-        video.error_message = f"Action detection failed: {str(e)}"
-        video.save()
-        return {"status": "error", "message": str(e)}
+        _set_video_status(video_id, 'error', error_message=f"Action detection failed: {str(e)}")
+        raise
 
 
 @shared_task(bind=True)
@@ -297,74 +341,57 @@ def calculate_stats_task(self, video_id):
     Calculate player statistics from detected actions
     """
     try:
-        video = Video.objects.get(id=video_id)
-        players = Player.objects.filter(video=video)
+        video = Video.objects.only('id', 'duration').get(id=video_id)
         
         logger.info(f"Calculating stats for video {video_id}")
         
-        # Calculate stats for each player
-        for player in players:
-            actions = Action.objects.filter(video=video, player=player)
-            
-            # Initialize stats
-            stats = Stats.objects.create(
-                video=video,
-                player=player
-            )
-            
-            # Count different action types
-            for action in actions:
-                if action.type == 'shot_2pt':
-                    stats.fga_2pt += 1
-                    if action.is_successful:
-                        stats.fgm_2pt += 1
-                elif action.type == 'shot_3pt':
-                    stats.fga_3pt += 1
-                    if action.is_successful:
-                        stats.fgm_3pt += 1
-                elif action.type == 'free_throw':
-                    stats.fta += 1
-                    if action.is_successful:
-                        stats.ftm += 1
-                elif action.type == 'assist':
-                    stats.assists += 1
-                elif action.type in ['rebound_offensive', 'rebound_defensive']:
-                    if action.type == 'rebound_offensive':
-                        stats.offensive_rebounds += 1
-                    else:
-                        stats.defensive_rebounds += 1
-                elif action.type == 'steal':
-                    stats.steals += 1
-                elif action.type == 'block':
-                    stats.blocks += 1
-                elif action.type == 'turnover':
-                    stats.turnovers += 1
-                elif action.type == 'foul':
-                    stats.fouls += 1
+        # Count actions per player, type and outcome in a single GROUP BY
+        action_counts = (
+            Action.objects.filter(video=video, player__isnull=False)
+            .values('player_id', 'type', 'is_successful')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        counts_by_player = {}
+        for row in action_counts:
+            counts_by_player.setdefault(row['player_id'], []).append(row)
+        
+        # Calculate minutes played (simplified)
+        minutes_played = video.duration / 60 if video.duration else 0
+        
+        # Build stats for each player
+        stats_rows = []
+        for player_id in Player.objects.filter(video=video).values_list('id', flat=True):
+            stats = Stats(video=video, player_id=player_id, minutes_played=minutes_played)
             
-            # Calculate minutes played (simplified)
-            stats.minutes_played = video.duration / 60 if video.duration else 0
+            for row in counts_by_player.get(player_id, []):
+                fields = STATS_FIELDS_BY_ACTION_TYPE.get(row['type'])
+                if fields is None:
+                    continue
+                
+                attempted_field, made_field = fields
+                setattr(stats, attempted_field, getattr(stats, attempted_field) + row['count'])
+                if made_field and row['is_successful']:
+                    setattr(stats, made_field, getattr(stats, made_field) + row['count'])
             
-            stats.save()  # This will auto-calculate points and rebounds
+            # bulk_create skips save(), so derive the totals here
+            stats.calculate_points()
+            stats.calculate_rebounds()
+            stats_rows.append(stats)
+        
+        Stats.objects.bulk_create(stats_rows)
         
         # Update video status
-        video.status = 'highlights_created'  # Ready for highlight generation
-        video.save()
+        _set_video_status(video.id, 'highlights_created')  # Ready for highlight generation
         
         logger.info(f"Stats calculation completed for video {video_id}")
         
-        # Trigger highlight generation
-        auto_generate_highlights_task.delay(str(video.id))
-        
-        return {"status": "completed", "stats_created": players.count()}
+        return {"status": "completed", "stats_created": len(stats_rows)}
         
     except Exception as e:
         logger.error(f"Error calculating stats for video {video_id}: {str(e)}")
-        video = Video.objects.get(id=video_id)
-        video.status = 'error'
-        video.error_message = f"Stats calculation failed: {str(e)}"
-        video.save()
-        return {"status": "error", "message": str(e)}
+        _set_video_status(video_id, 'error', error_message=f"Stats calculation failed: {str(e)}")
+        raise
 
 
 @shared_task(bind=True)
@@ -384,8 +411,8 @@ def auto_generate_highlights_task(self, video_id):
             ('defensive_highlights', 0.7, 30)
         ]
         
-        for highlight_type, min_confidence, max_duration in highlight_types:
-            highlight = Highlight.objects.create(
+        highlights = Highlight.objects.bulk_create([
+            Highlight(
                 video=video,
                 title=f"Auto-generated {highlight_type.replace('_', ' ').title()}",
                 highlight_type=highlight_type,
@@ -393,14 +420,13 @@ def auto_generate_highlights_task(self, video_id):
                 max_duration=max_duration,
                 is_processing=True
             )
-            
-            # Generate highlight video
-            create_highlight_video.delay(str(highlight.id))
+            for highlight_type, min_confidence, max_duration in highlight_types
+        ])
         
-        # Mark video as complete
-        video.status = 'done'
-        video.processing_completed_at = timezone.now()
-        video.save()
+        # Render highlight videos in parallel, then mark the video as complete
+        chord(
+            create_highlight_video.si(str(highlight.id)) for highlight in highlights
+        )(finalize_video_task.si(str(video.id)))
         
         return {"status": "completed", "highlights_created": len(highlight_types)}
         
@@ -409,6 +435,31 @@ def auto_generate_highlights_task(self, video_id):
         return {"status": "error", "message": str(e)}
 
 
+@shared_task(bind=True)
+def finalize_video_task(self, video_id):
+    """
+    Mark a video as done once its highlight videos are rendered
+    """
+    _set_video_status(video_id, 'done', processing_completed_at=timezone.now())
+    return {"status": "completed", "video_id": video_id}
+
+
+@shared_task(bind=True)
+def flush_highlight_view_counts(self):
+    """
+    Persist highlight views buffered in Redis (scheduled by celery beat)
+    Delivery is at-least-once: the batch is only dropped from Redis after the UPDATE commits,
+    so a failed UPDATE is retried on the next run, but a worker dying between the commit and
+    the drop makes the next run apply the same batch again (views counted twice).
+    """
+    deltas = pop_view_counts()
+    with transaction.atomic():
+        if deltas:
+            apply_view_counts(deltas)
+        transaction.on_commit(ack_view_counts)
+    return {"status": "completed", "highlights_updated": len(deltas)}
+
+
 @shared_task(bind=True)
 def create_highlight_video(self, highlight_id):
     """
@@ -447,9 +498,9 @@ def create_highlight_video(self, highlight_id):
         # Sort by confidence and limit duration
         actions = actions.order_by('-confidence')
         
-        # Create video clips
-        video_clip = VideoFileClip(video.file.path)
-        clips = []
+        # Select clip ranges
+        segments = []
+        selected_actions = []
         total_duration = 0
         
         for action in actions:
@@ -459,40 +510,34 @@ def create_highlight_video(self, highlight_id):
             # Add buffer around action
             buffer = 1.0  # 1 second buffer
             start = max(0, action.start_time - buffer)
-            end = min(video_clip.duration, action.end_time + buffer)
+            end = action.end_time + buffer
+            if video.duration:
+                end = min(video.duration, end)
             
             clip_duration = end - start
             if total_duration + clip_duration <= highlight.max_duration:
-                clip = video_clip.subclip(start, end)
-                clips.append(clip)
+                segments.append((start, end))
+                selected_actions.append(action)
                 total_duration += clip_duration
-                
-                # Add action to highlight
-                highlight.actions.add(action)
         
-        if clips:
-            # Concatenate clips
-            final_clip = concatenate_videoclips(clips)
-            
+        # Add the selected actions to the highlight in one insert
+        if selected_actions:
+            highlight.actions.add(*selected_actions)
+        
+        if segments:
             # Save highlight video
             highlight_path = f'highlights/{timezone.now().strftime("%Y/%m/%d")}/highlight_{highlight_id}.mp4'
             full_path = os.path.join(settings.MEDIA_ROOT, highlight_path)
             os.makedirs(os.path.dirname(full_path), exist_ok=True)
             
-            final_clip.write_videofile(full_path, verbose=False, logger=None)
+            # Cut and join the clips with ffmpeg; keyframe snapping can lengthen the clips
+            total_duration = concat_video_segments(video.file.path, segments, full_path)
             
             # Update highlight object
             highlight.file = highlight_path
             highlight.duration = total_duration
             highlight.is_processing = False
-            highlight.save()
-            
-            # Clean up
-            final_clip.close()
-            for clip in clips:
-                clip.close()
-        
-        video_clip.close()
+            highlight.save(update_fields=['file', 'duration', 'is_processing'])
         
         logger.info(f"Highlight video created for highlight {highlight_id}")
         
@@ -500,13 +545,113 @@ def create_highlight_video(self, highlight_id):
         
     except Exception as e:
         logger.error(f"Error creating highlight video for highlight {highlight_id}: {str(e)}")
-        highlight = Highlight.objects.get(id=highlight_id)
-        highlight.is_processing = False
-        highlight.processing_error = str(e)
-        highlight.save()
+        Highlight.objects.filter(id=highlight_id).update(
+            is_processing=False,
+            processing_error=str(e)
+        )
         return {"status": "error", "message": str(e)}
 
 
+def action_recognition_pipeline(video_id, model_type='mmaction2_tsn', confidence_threshold=0.5):
+    """Chain of action detection followed by stats and highlight generation"""
+    return chain(
+        detect_actions_with_mmaction.si(video_id, model_type, confidence_threshold),
+        calculate_stats_task.si(video_id),
+        auto_generate_highlights_task.si(video_id)
+    )
+
+
+def _track_player_detections(results, frame_indices, player_tracks):
+    """
+    Feed person detections from a batch of YOLO results into the tracker
+    results[i] belongs to the frame at frame_indices[i]
+    """
+    for result, frame_idx in zip(results, frame_indices):
+        boxes = result.boxes
+        if boxes is None:
+            continue
+        
+        cls = boxes.cls.cpu().numpy()
+        conf = boxes.conf.cpu().numpy()
+        # Filter for person class (class 0 in COCO)
+        keep = (cls == 0) & (conf > 0.5)
+        
+        # x1, y1, x2, y2
+        player_tracks.update(frame_idx, boxes.xyxy.cpu().numpy()[keep], conf[keep])
+
+
+# mmaction2 pipeline steps that read/sample frames from a file
+_MMACTION_DECODE_STEPS = (
+    'OpenCVInit', 'OpenCVDecode', 'DecordInit', 'DecordDecode',
+    'PyAVInit', 'PyAVDecode', 'RawFrameDecode'
+)
+
+
+def _build_frame_pipeline(model):
+    """
+    Build the recognizer's test pipeline without its decode/sampling steps
+    so it can be fed frames already decoded in memory
+    Returns (pipeline, clip_len, num_clips)
+    """
+    init_default_scope(model.cfg.get('default_scope', 'mmaction'))
+    
+    steps = []
+    clip_len, num_clips = 1, 1
+    for step in model.cfg.test_pipeline:
+        if 'SampleFrames' in step['type']:
+            clip_len, num_clips = step['clip_len'], step['num_clips']
+        elif step['type'] not in _MMACTION_DECODE_STEPS:
+            steps.append(step)
+    
+    return Compose(steps), clip_len, num_clips
+
+
+def _recognize_segments(model, test_pipeline, segment_frames, clip_len, num_clips):
+    """
+    Run one batched recognizer forward pass over several segments
+    Returns (label_idx, confidence) of the top class for each segment
+    """
+    samples = []
+    for frames in segment_frames:
+        samples.append(test_pipeline({
+            'imgs': frames,
+            'img_shape': frames[0].shape[:2],
+            'original_shape': frames[0].shape[:2],
+            'modality': 'RGB',
+            'label': -1,
+            'start_index': 0,
+            'clip_len': clip_len,
+            'num_clips': num_clips,
+        }))
+    
+    # Autocast keeps the float32 data preprocessor working while the backbone runs in FP16
+    device_type = next(model.parameters()).device.type
+    with torch.inference_mode(), torch.autocast(device_type, dtype=torch.float16, enabled=device_type == 'cuda'):
+        results = model.test_step(pseudo_collate(samples))
+    
+    predictions = []
+    for result in results:
+        # mmaction2 >= 1.1 exposes a plain score tensor, 1.0 wraps it in LabelData
+        scores = result.pred_score if hasattr(result, 'pred_score') else result.pred_scores.item
+        scores = scores.float().cpu().numpy()
+        top_idx = int(np.argmax(scores))
+        predictions.append((top_idx, float(scores[top_idx])))
+    
+    return predictions
+
+
+def _batched(iterable, size):
+    """Yield lists of up to `size` items from an iterable"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 def _map_mmaction_label_to_action_type(label_idx):
     """
     Map mmaction2 label index to our action types
@@ -1,17 +1,154 @@
 import os
+import bisect
+import json
+import queue
+import subprocess
+import tempfile
+import threading
 import cv2
 import numpy as np
 from moviepy.editor import VideoFileClip
+from moviepy.config import get_setting
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def open_video_capture(video_path):
+    """Open a video for frame decoding, using hardware decode (NVDEC, VAAPI, ...) when available"""
+    cap = cv2.VideoCapture(
+        video_path,
+        cv2.CAP_FFMPEG,
+        [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    )
+    if not cap.isOpened():
+        # OpenCV build without FFmpeg hardware support - use the default backend
+        cap = cv2.VideoCapture(video_path)
+    return cap
+
+
+def iter_sampled_frames(cap, interval):
+    """
+    Yield (frame_idx, frame) for every `interval`-th frame of an open capture
+    Skipped frames are only grabbed, never converted/copied to numpy
+    """
+    frame_idx = 0
+    while cap.grab():
+        if frame_idx % interval == 0:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            yield frame_idx, frame
+        frame_idx += 1
+
+
+def prefetch(iterable, maxsize=64):
+    """
+    Yield items of `iterable` while a background thread produces the next ones
+    Lets video decoding (which releases the GIL) overlap with model inference
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(entry):
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put((None, item)):
+                    return
+        except Exception as e:
+            put((e, None))
+            return
+        put((None, done))
+    
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            error, item = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        # Unblock the producer if the consumer stops early
+        stop.set()
+        thread.join()
+
+
+def iter_segment_frames(cap, fps, duration, segment_length, num_frames):
+    """
+    Yield (start_time, end_time, frames) for consecutive segments of an open capture
+    Each segment gets `num_frames` evenly spaced RGB frames; the video is decoded once, in order
+    """
+    frame_idx = -1
+    frame = None
+    
+    for start_time in range(0, int(duration), segment_length):
+        end_time = min(start_time + segment_length, duration)
+        first = int(start_time * fps)
+        last = max(first, int(end_time * fps) - 1)
+        
+        frames = []
+        for target in np.linspace(first, last, num_frames).astype(int):
+            while frame_idx < target:
+                if not cap.grab():
+                    return
+                frame_idx += 1
+                frame = None
+            
+            if frame is None:
+                ret, bgr = cap.retrieve()
+                if not ret:
+                    return
+                frame = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+            frames.append(frame)
+        
+        yield start_time, end_time, frames
+
+
+def probe_video(video_path):
+    """Read fps, size and duration from the container headers with a single ffprobe call"""
+    result = subprocess.run(
+        [
+            getattr(settings, 'FFPROBE_BINARY', 'ffprobe'), '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height,avg_frame_rate:format=duration',
+            '-of', 'json', video_path
+        ],
+        capture_output=True, text=True, check=True
+    )
+    info = json.loads(result.stdout)
+    stream = info['streams'][0]
+    num, den = (float(part) for part in stream['avg_frame_rate'].split('/'))
+    
+    return {
+        'fps': num / den if den else 0,
+        'width': int(stream['width']),
+        'height': int(stream['height']),
+        'duration': float(info['format']['duration'])
+    }
+
+
 def extract_video_metadata(video_path):
     """Extract metadata from video file"""
     try:
-        # Use OpenCV for basic properties
+        try:
+            return probe_video(video_path)
+        except (OSError, subprocess.CalledProcessError, KeyError, IndexError, ValueError):
+            pass  # ffprobe missing or unreadable output, fall back to OpenCV
+        
         cap = cv2.VideoCapture(video_path)
         metadata = {}
         
@@ -23,14 +160,6 @@ def extract_video_metadata(video_path):
             metadata['duration'] = frame_count / metadata['fps'] if metadata['fps'] > 0 else 0
             cap.release()
         
-        # Use MoviePy for duration verification
-        try:
-            clip = VideoFileClip(video_path)
-            metadata['duration'] = clip.duration
-            clip.close()
-        except Exception:
-            pass  # Use OpenCV duration if MoviePy fails
-        
         return metadata
         
     except Exception as e:
@@ -71,10 +200,9 @@ def create_video_thumbnail(video_path, output_path, timestamp=5.0):
     """Create thumbnail from video at specified timestamp"""
     try:
         cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_number = int(timestamp * fps)
         
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        # Seek by time, which lets the backend jump to the nearest keyframe
+        cap.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
         ret, frame = cap.read()
         
         if ret:
@@ -83,7 +211,7 @@ def create_video_thumbnail(video_path, output_path, timestamp=5.0):
             thumbnail_width = 320
             thumbnail_height = int(height * thumbnail_width / width)
             
-            thumbnail = cv2.resize(frame, (thumbnail_width, thumbnail_height))
+            thumbnail = cv2.resize(frame, (thumbnail_width, thumbnail_height), interpolation=cv2.INTER_AREA)
             cv2.imwrite(output_path, thumbnail)
             
         cap.release()
@@ -97,15 +225,13 @@ def create_video_thumbnail(video_path, output_path, timestamp=5.0):
 def segment_video(video_path, segment_length=3):
     """Segment video into clips of specified length"""
     try:
-        clip = VideoFileClip(video_path)
-        duration = clip.duration
+        duration = extract_video_metadata(video_path).get('duration', 0)
         
         segments = []
         for start_time in range(0, int(duration), segment_length):
             end_time = min(start_time + segment_length, duration)
             segments.append((start_time, end_time))
         
-        clip.close()
         return segments
         
     except Exception as e:
@@ -139,44 +265,120 @@ def calculate_video_quality_score(video_path):
         return 0
 
 
-def detect_scene_changes(video_path, threshold=0.3):
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of (M, 4) and (N, 4) x1, y1, x2, y2 boxes as an (M, N) array"""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+class PlayerTracks:
+    """
+    IoU tracker storing tracks and detections as parallel numpy arrays
+    A detection joins the active track it overlaps most (greedy), otherwise it starts a new track
+    """
+    
+    def __init__(self, iou_threshold=0.3, max_gap=90):
+        self.iou_threshold = iou_threshold
+        self.max_gap = max_gap  # frames a track may go unseen before it is closed
+        
+        # One row per track
+        self.last_bboxes = np.empty((0, 4), dtype=np.float32)
+        self.last_frames = np.empty(0, dtype=np.int64)
+        
+        # One chunk per update, concatenated on demand
+        self._track_ids = []
+        self._bboxes = []
+        self._confidences = []
+    
+    @property
+    def num_tracks(self):
+        return len(self.last_frames)
+    
+    def update(self, frame_idx, bboxes, confidences):
+        """Assign one frame's (M, 4) boxes and (M,) confidences to tracks"""
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        track_ids = np.full(len(bboxes), -1, dtype=np.int64)
+        
+        active = np.flatnonzero(frame_idx - self.last_frames <= self.max_gap)
+        if len(bboxes) and len(active):
+            iou = iou_matrix(bboxes, self.last_bboxes[active])
+            # Greedy matching, best overlap first
+            for flat_idx in np.argsort(iou, axis=None)[::-1]:
+                det, trk = divmod(int(flat_idx), len(active))
+                if iou[det, trk] < self.iou_threshold:
+                    break
+                if track_ids[det] == -1 and active[trk] not in track_ids:
+                    track_ids[det] = active[trk]
+        
+        new = track_ids == -1
+        track_ids[new] = np.arange(self.num_tracks, self.num_tracks + int(new.sum()))
+        self.last_bboxes = np.concatenate([self.last_bboxes, bboxes[new]])
+        self.last_frames = np.concatenate([self.last_frames, np.full(int(new.sum()), frame_idx)])
+        
+        self.last_bboxes[track_ids] = bboxes
+        self.last_frames[track_ids] = frame_idx
+        self._track_ids.append(track_ids)
+        self._bboxes.append(bboxes)
+        self._confidences.append(confidences)
+    
+    def summary(self):
+        """Per-track (appearances, mean confidence, mean bbox area) arrays"""
+        if not self._track_ids:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty, empty
+        
+        track_ids = np.concatenate(self._track_ids)
+        bboxes = np.concatenate(self._bboxes)
+        confidences = np.concatenate(self._confidences)
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+        
+        counts = np.bincount(track_ids, minlength=self.num_tracks)
+        safe_counts = np.maximum(counts, 1)
+        avg_confidence = np.bincount(track_ids, weights=confidences, minlength=self.num_tracks) / safe_counts
+        avg_bbox_area = np.bincount(track_ids, weights=areas, minlength=self.num_tracks) / safe_counts
+        return counts, avg_confidence, avg_bbox_area
+
+
+MOTION_DOWNSAMPLE = 4  # frame downscale factor for scene/motion differencing
+
+
+def _downsample_gray(frame, factor=MOTION_DOWNSAMPLE):
+    """Grayscale copy of a BGR frame shrunk by `factor` on each side"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+
+
+def _gray_histogram(gray):
+    """256-bin intensity histogram of an 8-bit grayscale image"""
+    return np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+
+
+def detect_scene_changes(video_path, threshold=0.3, frame_step=5):
     """Detect scene changes in video for better action segmentation"""
     try:
-        cap = cv2.VideoCapture(video_path)
+        cap = open_video_capture(video_path)
+        inv_fps = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30)
         scene_changes = []
+        prev_hist = None
         
-        ret, prev_frame = cap.read()
-        if not ret:
-            return scene_changes
-        
-        prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-        frame_count = 0
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Calculate histogram difference
-            hist_prev = cv2.calcHist([prev_gray], [0], None, [256], [0, 256])
-            hist_curr = cv2.calcHist([gray], [0], None, [256], [0, 256])
-            
-            # Normalize histograms
-            cv2.normalize(hist_prev, hist_prev)
-            cv2.normalize(hist_curr, hist_curr)
+        # Cuts span several frames, so compare every `frame_step`-th frame
+        for frame_idx, frame in iter_sampled_frames(cap, frame_step):
+            hist = _gray_histogram(_downsample_gray(frame))
             
-            # Calculate correlation
-            correlation = cv2.compareHist(hist_prev, hist_curr, cv2.HISTCMP_CORREL)
+            if prev_hist is not None:
+                # Same score as cv2.HISTCMP_CORREL
+                correlation = np.corrcoef(prev_hist, hist)[0, 1]
+                if correlation < threshold:
+                    scene_changes.append(frame_idx * inv_fps)
             
-            if correlation < threshold:
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                timestamp = frame_count / fps
-                scene_changes.append(timestamp)
-            
-            prev_gray = gray.copy()
-            frame_count += 1
+            prev_hist = hist
         
         cap.release()
         return scene_changes
@@ -216,6 +418,109 @@ def optimize_video_for_processing(input_path, output_path, target_fps=15, max_wi
         return False
 
 
+def probe_keyframes(video_path):
+    """Sorted timestamps of the video keyframes, read from packet flags without decoding"""
+    result = subprocess.run(
+        [
+            getattr(settings, 'FFPROBE_BINARY', 'ffprobe'), '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=p=0', video_path
+        ],
+        capture_output=True, text=True, check=True
+    )
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags and pts_time not in ('', 'N/A'):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+
+def _snap_to_keyframes(segments, keyframes, tolerance):
+    """
+    Move each segment start back to the keyframe at or before it
+    Returns None if any start has no keyframe within `tolerance` seconds before it
+    """
+    snapped = []
+    for start, end in segments:
+        index = bisect.bisect_right(keyframes, start + 1e-3) - 1
+        if index < 0 or start - keyframes[index] > tolerance:
+            return None
+        snapped.append((keyframes[index], end))
+    return snapped
+
+
+def _concat_files(entries, output_path):
+    """Join (path, inpoint, outpoint) entries with the concat demuxer, copying streams"""
+    lines = ['ffconcat version 1.0']
+    for path, inpoint, outpoint in entries:
+        escaped_path = path.replace("'", "'\\''")
+        lines.append(f"file '{escaped_path}'")
+        if inpoint is not None:
+            lines.append(f"inpoint {inpoint:.3f}")
+            lines.append(f"outpoint {outpoint:.3f}")
+    
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as list_file:
+        list_file.write('\n'.join(lines) + '\n')
+    
+    try:
+        subprocess.run(
+            [
+                get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0', '-i', list_file.name, '-c', 'copy', output_path
+            ],
+            capture_output=True, text=True, check=True
+        )
+    finally:
+        os.remove(list_file.name)
+
+
+def _encode_segments(input_path, segments, output_path):
+    """Cut each segment frame-accurately with a fast re-encode, then join the pieces"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pieces = []
+        for index, (start, end) in enumerate(segments):
+            piece = os.path.join(tmp_dir, f'segment_{index}.mp4')
+            subprocess.run(
+                [
+                    get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+                    '-ss', f'{start:.3f}', '-t', f'{end - start:.3f}', '-i', input_path,
+                    '-c:v', 'libx264', '-preset', 'veryfast', '-c:a', 'aac', piece
+                ],
+                capture_output=True, text=True, check=True
+            )
+            pieces.append((piece, None, None))
+        # Every piece starts on a keyframe, so joining them needs no re-encode
+        _concat_files(pieces, output_path)
+
+
+def concat_video_segments(input_path, segments, output_path):
+    """
+    Cut (start, end) segments out of a video and join them into output_path
+    When every start is within HIGHLIGHT_KEYFRAME_SNAP seconds after a keyframe, the starts are
+    snapped back to those keyframes and streams are copied without re-encoding (clips then begin
+    slightly early). Otherwise the segments are cut at the exact times and re-encoded.
+    Returns the duration of the joined video.
+    """
+    tolerance = getattr(settings, 'HIGHLIGHT_KEYFRAME_SNAP', 0.5)
+    try:
+        snapped = _snap_to_keyframes(segments, probe_keyframes(input_path), tolerance)
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        logger.warning(f"Could not read keyframes of {input_path}, re-encoding: {str(e)}")
+        snapped = None
+    
+    if snapped is not None:
+        try:
+            _concat_files([(input_path, start, end) for start, end in snapped], output_path)
+            return sum(end - start for start, end in snapped)
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"Stream copy concat failed, re-encoding: {e.stderr.strip()}")
+    
+    _encode_segments(input_path, segments, output_path)
+    return sum(end - start for start, end in segments)
+
+
 class VideoProcessor:
     """Class for advanced video processing operations"""
     
@@ -226,22 +531,13 @@ class VideoProcessor:
     def extract_frames(self, interval=1.0):
         """Extract frames at specified intervals"""
         try:
-            cap = cv2.VideoCapture(self.video_path)
+            cap = open_video_capture(self.video_path)
             fps = cap.get(cv2.CAP_PROP_FPS)
-            interval_frames = int(fps * interval)
-            
-            frames = []
-            frame_count = 0
+            interval_frames = max(1, int(fps * interval))
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                if frame_count % interval_frames == 0:
-                    frames.append(frame)
-                
-                frame_count += 1
+            frames = [
+                frame for _, frame in iter_sampled_frames(cap, interval_frames)
+            ]
             
             cap.release()
             return frames
@@ -253,22 +549,25 @@ class VideoProcessor:
     def detect_motion_areas(self, threshold=25):
         """Detect areas with significant motion"""
         try:
-            cap = cv2.VideoCapture(self.video_path)
+            cap = open_video_capture(self.video_path)
             
+            inv_fps = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30)
             ret, prev_frame = cap.read()
             if not ret:
                 return []
             
-            prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
+            prev_gray = _downsample_gray(prev_frame)
             motion_areas = []
             frame_count = 0
+            scale = MOTION_DOWNSAMPLE
+            min_area = 1000 / (scale * scale)  # Minimum full-resolution area threshold
             
             while True:
                 ret, frame = cap.read()
                 if not ret:
                     break
                 
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                gray = _downsample_gray(frame)
                 
                 # Calculate frame difference
                 diff = cv2.absdiff(prev_gray, gray)
@@ -277,21 +576,19 @@ class VideoProcessor:
                 # Find contours
                 contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
                 
-                # Filter significant motion areas
+                # Filter significant motion areas, reported in full-resolution pixels
                 for contour in contours:
                     area = cv2.contourArea(contour)
-                    if area > 1000:  # Minimum area threshold
+                    if area > min_area:
                         x, y, w, h = cv2.boundingRect(contour)
-                        fps = cap.get(cv2.CAP_PROP_FPS)
-                        timestamp = frame_count / fps
                         
                         motion_areas.append({
-                            'timestamp': timestamp,
-                            'bbox': (x, y, w, h),
-                            'area': area
+                            'timestamp': frame_count * inv_fps,
+                            'bbox': (x * scale, y * scale, w * scale, h * scale),
+                            'area': area * scale * scale
                         })
                 
-                prev_gray = gray.copy()
+                prev_gray = gray
                 frame_count += 1
             
             cap.release()
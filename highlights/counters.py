@@ -0,0 +1,58 @@
+import logging
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+VIEW_COUNTS_KEY = 'hl:views'
+VIEW_COUNTS_FLUSHING_KEY = 'hl:views:flushing'
+
+_client = None
+
+
+def _get_client():
+    """Lazily create the Redis client used for coalesced counters"""
+    global _client
+    if _client is None:
+        url = getattr(settings, 'HIGHLIGHT_COUNTER_REDIS_URL', settings.CELERY_BROKER_URL)
+        # Short timeouts: views run on the request path and fall back to the database
+        timeout = getattr(settings, 'HIGHLIGHT_COUNTER_REDIS_TIMEOUT', 0.1)
+        _client = redis.Redis.from_url(url, socket_connect_timeout=timeout, socket_timeout=timeout)
+    return _client
+
+
+def incr_view_count(highlight_id):
+    """
+    Buffer one view of a highlight in Redis
+    Returns False when Redis is unreachable so the caller can write through
+    """
+    try:
+        _get_client().hincrby(VIEW_COUNTS_KEY, str(highlight_id), 1)
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Could not buffer view of highlight {highlight_id}: {str(e)}")
+        return False
+
+
+def pop_view_counts():
+    """
+    Take the buffered view deltas as {highlight_id: delta}
+    The hash is renamed before reading so views arriving meanwhile go to a fresh hash.
+    A batch left over from a failed flush is returned again instead of a new one.
+    """
+    client = _get_client()
+    if not client.exists(VIEW_COUNTS_FLUSHING_KEY):
+        try:
+            client.rename(VIEW_COUNTS_KEY, VIEW_COUNTS_FLUSHING_KEY)
+        except redis.ResponseError:
+            # Nothing buffered since the last flush
+            return {}
+    return {
+        key.decode(): int(value)
+        for key, value in client.hgetall(VIEW_COUNTS_FLUSHING_KEY).items()
+    }
+
+
+def ack_view_counts():
+    """Drop the batch returned by pop_view_counts once it is persisted"""
+    _get_client().delete(VIEW_COUNTS_FLUSHING_KEY)
@@ -0,0 +1,15 @@
+import django_filters
+
+from .models import Highlight
+
+
+class HighlightFilter(django_filters.FilterSet):
+    """Query parameter filters for highlight listings"""
+    player = django_filters.NumberFilter(field_name='player__id')
+    type = django_filters.ChoiceFilter(field_name='highlight_type', choices=Highlight.HIGHLIGHT_TYPES)
+    min_duration = django_filters.NumberFilter(field_name='duration', lookup_expr='gte')
+    max_duration = django_filters.NumberFilter(field_name='duration', lookup_expr='lte')
+    
+    class Meta:
+        model = Highlight
+        fields = ['highlight_type']
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from highlights.models import Highlight, refresh_action_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored action_count of every highlight (run once after adding the column)'
+
+    def handle(self, *args, **options):
+        highlight_ids = list(Highlight.objects.values_list('id', flat=True))
+        refresh_action_counts(highlight_ids)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed action_count of {len(highlight_ids)} highlights'))
@@ -1,8 +1,14 @@
-from django.db import models
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
 from videos.models import Video
 from players.models import Player
 from actions.models import Action
 from core.models import BaseModel
+from highlights.counters import incr_view_count
 
 
 class Highlight(BaseModel):
@@ -30,6 +36,7 @@ class Highlight(BaseModel):
     
     # Actions included in this highlight
     actions = models.ManyToManyField(Action, related_name='highlights', blank=True)
+    action_count = models.PositiveIntegerField(default=0)  # Kept in sync with actions by signals
     
     # Generation settings
     min_confidence = models.FloatField(default=0.7)
@@ -47,21 +54,94 @@ class Highlight(BaseModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['video', 'highlight_type']),
-            models.Index(fields=['player', 'highlight_type']),
+            models.Index(fields=['player', 'highlight_type', '-created_at']),
+            models.Index(fields=['-created_at']),
         ]
         
     def __str__(self):
         player_info = f" - {self.player.jersey_number}" if self.player else ""
         return f"Highlight: {self.title}{player_info}"
     
-    @property
-    def action_count(self):
-        return self.actions.count()
-    
     def increment_view_count(self):
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        # Buffered in Redis and flushed in batches by flush_highlight_view_counts
+        if not incr_view_count(self.pk):
+            type(self).objects.filter(pk=self.pk).update(view_count=F('view_count') + 1)
     
     def increment_download_count(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count']) 
\ No newline at end of file
+        type(self).objects.filter(pk=self.pk).update(download_count=F('download_count') + 1)
+
+
+def apply_view_counts(deltas):
+    """Add buffered view deltas ({highlight_id: delta}) to view_count in one UPDATE"""
+    if not deltas:
+        return 0
+    return Highlight.objects.filter(id__in=deltas.keys()).update(
+        view_count=F('view_count') + Case(
+            *[When(id=highlight_id, then=delta) for highlight_id, delta in deltas.items()],
+            default=0,
+        )
+    )
+
+
+def refresh_action_counts(highlight_ids):
+    """Recompute the stored action_count of the given highlights in one UPDATE"""
+    through = Highlight.actions.through
+    counts = (
+        through.objects.filter(highlight_id=OuterRef('pk'))
+        .values('highlight_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    Highlight.objects.filter(id__in=highlight_ids).update(
+        action_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+@receiver(m2m_changed, sender=Highlight.actions.through)
+def update_action_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Highlight.action_count in sync when actions are added or removed"""
+    if reverse and action == 'pre_clear':
+        # pk_set is not provided on clear, remember which highlights are affected
+        instance._cleared_highlight_ids = list(instance.highlights.values_list('id', flat=True))
+        return
+    
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if reverse:
+        # instance is an Action, pk_set holds highlight ids
+        highlight_ids = pk_set if action != 'post_clear' else instance._cleared_highlight_ids
+        refresh_action_counts(highlight_ids)
+    else:
+        instance.action_count = instance.actions.count()
+        Highlight.objects.filter(pk=instance.pk).update(action_count=instance.action_count)
+
+
+@receiver(pre_delete, sender=Action)
+def refresh_action_counts_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    Deleting actions drops their M2M rows without m2m_changed, so refresh the affected highlights
+    Runs one lookup and one UPDATE per delete() call, not per deleted action
+    """
+    is_queryset = isinstance(origin, models.QuerySet)
+    origin_model = origin.model if is_queryset else type(origin)
+    # A video (or its owner) being deleted takes its highlights with it
+    if origin_model in (Video, User) or getattr(origin, '_action_counts_refreshed', False):
+        return
+    
+    links = Highlight.actions.through.objects
+    if origin_model is Action:
+        links = links.filter(action__in=origin) if is_queryset else links.filter(action=origin)
+    elif origin_model is Player:
+        links = links.filter(action__player__in=origin) if is_queryset else links.filter(action__player=origin)
+    else:
+        # Unknown origin, fall back to this action only
+        links = links.filter(action=instance)
+        origin = None
+    
+    if origin is not None:
+        origin._action_counts_refreshed = True
+    highlight_ids = list(links.values_list('highlight_id', flat=True).distinct())
+    if highlight_ids:
+        # Delete runs in a transaction, refresh once the M2M rows are gone
+        transaction.on_commit(lambda: refresh_action_counts(highlight_ids))
@@ -1,14 +1,15 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Highlight
 from actions.serializers import ActionListSerializer
 from players.serializers import PlayerListSerializer
+from core.serializers import CachedFieldsModelSerializer
 
 
-class HighlightSerializer(serializers.ModelSerializer):
+class HighlightSerializer(CachedFieldsModelSerializer):
     """Serializer for Highlight model"""
     player = PlayerListSerializer(read_only=True)
     actions = ActionListSerializer(many=True, read_only=True)
-    action_count = serializers.ReadOnlyField()
     
     class Meta:
         model = Highlight
@@ -22,12 +23,25 @@ class HighlightSerializer(serializers.ModelSerializer):
             'id', 'file', 'duration', 'action_count', 'is_processing', 
             'processing_error', 'view_count', 'download_count', 'created_at', 'updated_at'
         ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Nested actions are only rendered when the view asks for them
+        if not self.context.get('include_actions'):
+            self.fields.pop('actions')
+
+
+# Columns read by HighlightListSerializer
+HIGHLIGHT_LIST_FIELDS = (
+    'id', 'title', 'highlight_type', 'duration', 'action_count', 'view_count',
+    'created_at', 'player', 'player__jersey_number'
+)
 
 
-class HighlightListSerializer(serializers.ModelSerializer):
+class HighlightListSerializer(CachedFieldsModelSerializer):
     """Simplified serializer for listing highlights"""
     player_jersey = serializers.CharField(source='player.jersey_number', read_only=True)
-    action_count = serializers.ReadOnlyField()
+    action_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Highlight
@@ -57,22 +71,16 @@ class HighlightCreateSerializer(serializers.ModelSerializer):
         highlight = super().create(validated_data)
         
         if action_ids:
-            # Add specified actions to highlight
+            # Add the specified actions of this video by id, without loading them
             from actions.models import Action
-            actions = Action.objects.filter(id__in=action_ids, video=highlight.video)
-            highlight.actions.set(actions)
+            valid_ids = Action.objects.filter(
+                id__in=action_ids, video=highlight.video
+            ).values_list('id', flat=True)
+            highlight.actions.add(*valid_ids)
         
         return highlight
 
 
-class HighlightFilterSerializer(serializers.Serializer):
-    """Serializer for highlight filtering parameters"""
-    player = serializers.IntegerField(required=False)
-    type = serializers.ChoiceField(choices=Highlight.HIGHLIGHT_TYPES, required=False)
-    min_duration = serializers.FloatField(min_value=0, required=False)
-    max_duration = serializers.FloatField(min_value=0, required=False)
-
-
 class HighlightDownloadSerializer(serializers.ModelSerializer):
     """Serializer for highlight download response"""
     download_url = serializers.SerializerMethodField()
@@ -82,6 +90,10 @@ class HighlightDownloadSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'file', 'download_url', 'duration']
     
     def get_download_url(self, obj):
+        cdn_prefix = getattr(settings, 'HIGHLIGHT_CDN_PREFIX', '')
+        if obj.file and cdn_prefix:
+            # Files are served from the CDN, no storage/request URL building needed
+            return f"{cdn_prefix.rstrip('/')}/{obj.file.name}"
         request = self.context.get('request')
         if obj.file and request:
             return request.build_absolute_uri(obj.file.url)
@@ -3,52 +3,56 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse, Http404
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch
 import os
 
 from .models import Highlight
+from .filters import HighlightFilter
 from videos.models import Video
+from actions.models import Action
+from actions.serializers import ACTION_LIST_FIELDS
 from .serializers import (
     HighlightSerializer, HighlightListSerializer, HighlightCreateSerializer,
-    HighlightFilterSerializer, HighlightDownloadSerializer
+    HighlightDownloadSerializer, HIGHLIGHT_LIST_FIELDS
 )
 from core.tasks import create_highlight_video
 
+HIGHLIGHT_TYPES_PAYLOAD = {
+    'highlight_types': [{'value': value, 'label': label} for value, label in Highlight.HIGHLIGHT_TYPES]
+}
+
+
+def _with_list_columns(queryset):
+    """Highlights for HighlightListSerializer, loading only the columns it renders"""
+    return queryset.select_related('player').only(*HIGHLIGHT_LIST_FIELDS)
+
+
+def _with_actions(queryset):
+    """Highlights for HighlightSerializer, prefetching only the action columns it renders"""
+    return queryset.select_related('video', 'player').prefetch_related(
+        Prefetch('actions', queryset=Action.objects.select_related('player').only(*ACTION_LIST_FIELDS))
+    )
+
 
 class HighlightViewSet(viewsets.ModelViewSet):
     """ViewSet for Highlight operations"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['highlight_type']
+    filterset_class = HighlightFilter
     
     def get_queryset(self):
         queryset = Highlight.objects.filter(video__user=self.request.user)
         
-        # Apply custom filters
-        player_id = self.request.query_params.get('player')
-        if player_id:
-            queryset = queryset.filter(player__id=player_id)
-        
-        highlight_type = self.request.query_params.get('type')
-        if highlight_type:
-            queryset = queryset.filter(highlight_type=highlight_type)
-        
-        min_duration = self.request.query_params.get('min_duration')
-        if min_duration:
-            try:
-                queryset = queryset.filter(duration__gte=float(min_duration))
-            except ValueError:
-                pass
-        
-        max_duration = self.request.query_params.get('max_duration')
-        if max_duration:
-            try:
-                queryset = queryset.filter(duration__lte=float(max_duration))
-            except ValueError:
-                pass
-        
-        return queryset.select_related('video', 'player').prefetch_related('actions').order_by('-created_at')
+        if self.action == 'list':
+            queryset = _with_list_columns(queryset)
+        elif self.action == 'retrieve':
+            queryset = _with_actions(queryset)
+        else:
+            queryset = queryset.select_related('video', 'player')
+        return queryset.order_by('-created_at')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -57,6 +61,11 @@ class HighlightViewSet(viewsets.ModelViewSet):
             return HighlightListSerializer
         return HighlightSerializer
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_actions'] = self.action == 'retrieve'
+        return context
+    
     def perform_create(self, serializer):
         """Create highlight and start video generation"""
         highlight = serializer.save()
@@ -93,10 +102,7 @@ class HighlightViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def types(self, request):
         """Get available highlight types"""
-        return Response({
-            'highlight_types': [{'value': choice[0], 'label': choice[1]} 
-                              for choice in Highlight.HIGHLIGHT_TYPES]
-        })
+        return Response(HIGHLIGHT_TYPES_PAYLOAD)
     
     @action(detail=False, methods=['post'])
     def auto_generate(self, request):
@@ -126,15 +132,29 @@ class HighlightViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create highlight object
-        highlight = Highlight.objects.create(
-            video=video,
-            title=f"Auto-generated {highlight_type.replace('_', ' ').title()}",
-            highlight_type=highlight_type,
-            min_confidence=min_confidence,
-            max_duration=max_duration,
-            is_processing=True
-        )
+        with transaction.atomic():
+            # Lock the video row so concurrent requests cannot both start a job
+            Video.objects.select_for_update().only('id').get(id=video.id)
+            
+            # Reuse a generation of the same type that is still running
+            highlight = Highlight.objects.filter(
+                video=video, highlight_type=highlight_type, is_processing=True
+            ).only('id').first()
+            if highlight:
+                return Response({
+                    'message': 'Highlight generation already in progress',
+                    'highlight_id': highlight.id
+                })
+            
+            # Create highlight object
+            highlight = Highlight.objects.create(
+                video=video,
+                title=f"Auto-generated {highlight_type.replace('_', ' ').title()}",
+                highlight_type=highlight_type,
+                min_confidence=min_confidence,
+                max_duration=max_duration,
+                is_processing=True
+            )
         
         # Start generation task
         create_highlight_video.delay(str(highlight.id))
@@ -150,21 +170,11 @@ class HighlightListView(generics.ListAPIView):
     serializer_class = HighlightListSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['highlight_type']
+    filterset_class = HighlightFilter
     
     def get_queryset(self):
         queryset = Highlight.objects.filter(video__user=self.request.user)
-        
-        # Apply filters
-        player_id = self.request.query_params.get('player')
-        if player_id:
-            queryset = queryset.filter(player__id=player_id)
-        
-        highlight_type = self.request.query_params.get('type')
-        if highlight_type:
-            queryset = queryset.filter(highlight_type=highlight_type)
-        
-        return queryset.select_related('video', 'player').order_by('-created_at')
+        return _with_list_columns(queryset).order_by('-created_at')
 
 
 class HighlightDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -173,7 +183,15 @@ class HighlightDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Highlight.objects.filter(video__user=self.request.user)
+        queryset = Highlight.objects.filter(video__user=self.request.user)
+        if self.request.method == 'GET':
+            return _with_actions(queryset)
+        return queryset.select_related('video', 'player')
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_actions'] = self.request.method == 'GET'
+        return context
 
 
 class HighlightDownloadView(generics.GenericAPIView):
@@ -195,12 +213,14 @@ class HighlightDownloadView(generics.GenericAPIView):
         # Increment download count
         highlight.increment_download_count()
         
-        # Serve file
+        # Stream the file in chunks instead of reading it into memory
         try:
-            with open(highlight.file.path, 'rb') as f:
-                response = HttpResponse(f.read(), content_type='video/mp4')
-                response['Content-Disposition'] = f'attachment; filename="{highlight.title}.mp4"'
-                return response
+            return FileResponse(
+                open(highlight.file.path, 'rb'),
+                content_type='video/mp4',
+                as_attachment=True,
+                filename=f"{highlight.title}.mp4"
+            )
         except FileNotFoundError:
             return Response(
                 {'error': 'Video file not found on server'}, 
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import Player, PlayerProfile, ScoutProfile
 from django.contrib.auth.models import User
+from core.serializers import CachedFieldsModelSerializer
 
 
-class PlayerSerializer(serializers.ModelSerializer):
+class PlayerSerializer(CachedFieldsModelSerializer):
     """Serializer for Player model"""
     
     class Meta:
@@ -15,7 +16,7 @@ class PlayerSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'detection_confidence', 'avg_bbox_area']
 
 
-class PlayerListSerializer(serializers.ModelSerializer):
+class PlayerListSerializer(CachedFieldsModelSerializer):
     """Simplified serializer for listing players"""
     
     class Meta:
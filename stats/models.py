@@ -1,9 +1,56 @@
+from functools import cached_property
+
 from django.db import models
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Round
+from django.db.models.lookups import GreaterThan
 from videos.models import Video
 from players.models import Player
 from core.models import BaseModel
 
 
+def _shooting_pct(made, attempted):
+    """SQL expression matching calculate_shooting_percentages() for one made/attempted pair"""
+    return Case(
+        When(GreaterThan(attempted, 0), then=Round(Cast(made, FloatField()) * 100 / attempted, 1)),
+        default=Value(0.0),
+        output_field=FloatField()
+    )
+
+
+# Export columns after video_filename, in output order
+STATS_EXPORT_COLUMNS = (
+    'player_jersey', 'player_team', 'points',
+    'fga_2pt', 'fgm_2pt', 'fg2_pct', 'fga_3pt', 'fgm_3pt', 'fg3_pct',
+    'fta', 'ftm', 'ft_pct', 'fg_pct', 'assists', 'rebounds',
+    'offensive_rebounds', 'defensive_rebounds', 'steals', 'blocks',
+    'turnovers', 'fouls', 'minutes_played', 'plus_minus'
+)
+# Header of the CSV export, also the keys of each JSON export row
+STATS_EXPORT_FIELDS = ('video_filename',) + STATS_EXPORT_COLUMNS
+
+EXPORT_CHUNK_SIZE = 200  # rows fetched per database round trip while exporting
+
+
+class StatsQuerySet(models.QuerySet):
+    def export_rows(self, video_filename):
+        """
+        Yield export rows of one video as tuples in STATS_EXPORT_FIELDS order
+        Percentages are computed in SQL, no model instances are built
+        """
+        rows = self.annotate(
+            player_jersey=F('player__jersey_number'),
+            player_team=F('player__team_color'),
+            fg2_pct=_shooting_pct(F('fgm_2pt'), F('fga_2pt')),
+            fg3_pct=_shooting_pct(F('fgm_3pt'), F('fga_3pt')),
+            ft_pct=_shooting_pct(F('ftm'), F('fta')),
+            fg_pct=_shooting_pct(F('fgm_2pt') + F('fgm_3pt'), F('fga_2pt') + F('fga_3pt')),
+        ).values_list(*STATS_EXPORT_COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        
+        for values in rows:
+            yield (video_filename, *values)
+
+
 class Stats(BaseModel):
     video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='stats')
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='stats')
@@ -35,9 +82,16 @@ class Stats(BaseModel):
     # Advanced statistics (calculated)
     plus_minus = models.IntegerField(default=0)
     
+    objects = StatsQuerySet.as_manager()
+    
     class Meta:
         unique_together = ['video', 'player']
         verbose_name_plural = 'Stats'
+        indexes = [
+            models.Index(fields=['video', '-points']),
+            models.Index(fields=['video', '-assists']),
+            models.Index(fields=['video', '-rebounds']),
+        ]
         
     def __str__(self):
         return f"Stats - Player {self.player.jersey_number} - Video {self.video.id}"
@@ -59,14 +113,26 @@ class Stats(BaseModel):
             'ft_pct': round(ft_pct, 1),
         }
     
+    @cached_property
+    def shooting_percentages(self):
+        """Shooting percentages computed once per instance (for serializers reading several)"""
+        return self.calculate_shooting_percentages()
+    
     def calculate_points(self):
         """Calculate total points and update the field"""
         self.points = (self.fgm_2pt * 2) + (self.fgm_3pt * 3) + self.ftm
         return self.points
     
+    def calculate_rebounds(self):
+        """Calculate total rebounds and update the field"""
+        self.rebounds = self.offensive_rebounds + self.defensive_rebounds
+        return self.rebounds
+    
     def save(self, *args, **kwargs):
         # Auto-calculate points before saving
         self.calculate_points()
         # Calculate total rebounds
-        self.rebounds = self.offensive_rebounds + self.defensive_rebounds
+        self.calculate_rebounds()
+        # Drop percentages cached from the previous values
+        self.__dict__.pop('shooting_percentages', None)
         super().save(*args, **kwargs) 
\ No newline at end of file
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import Stats
 from players.serializers import PlayerListSerializer
+from core.serializers import CachedFieldsModelSerializer
 
 
-class StatsSerializer(serializers.ModelSerializer):
+class StatsSerializer(CachedFieldsModelSerializer):
     """Serializer for Stats model"""
     player = PlayerListSerializer(read_only=True)
     shooting_percentages = serializers.SerializerMethodField()
@@ -22,13 +23,20 @@ class StatsSerializer(serializers.ModelSerializer):
         ]
     
     def get_shooting_percentages(self, obj):
-        return obj.calculate_shooting_percentages()
+        return obj.shooting_percentages
 
 
-class StatsListSerializer(serializers.ModelSerializer):
+# Columns read by StatsListSerializer (fg_pct needs every attempt/made pair)
+STATS_LIST_FIELDS = (
+    'id', 'points', 'fga_2pt', 'fgm_2pt', 'fga_3pt', 'fgm_3pt', 'fta', 'ftm',
+    'assists', 'rebounds', 'minutes_played', 'player', 'player__jersey_number'
+)
+
+
+class StatsListSerializer(CachedFieldsModelSerializer):
     """Simplified serializer for listing stats"""
     player_jersey = serializers.CharField(source='player.jersey_number', read_only=True)
-    fg_pct = serializers.SerializerMethodField()
+    fg_pct = serializers.ReadOnlyField(source='shooting_percentages.fg_pct')
     
     class Meta:
         model = Stats
@@ -36,10 +44,6 @@ class StatsListSerializer(serializers.ModelSerializer):
             'id', 'player_jersey', 'points', 'fgm_2pt', 'fga_2pt', 'fgm_3pt', 'fga_3pt',
             'assists', 'rebounds', 'fg_pct', 'minutes_played'
         ]
-    
-    def get_fg_pct(self, obj):
-        percentages = obj.calculate_shooting_percentages()
-        return percentages['fg_pct']
 
 
 class StatsCreateUpdateSerializer(serializers.ModelSerializer):
@@ -66,36 +70,3 @@ class StatsCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Free throws made cannot exceed attempts")
         
         return data
-
-
-class StatsExportSerializer(serializers.ModelSerializer):
-    """Serializer for exporting stats to CSV/JSON"""
-    player_jersey = serializers.CharField(source='player.jersey_number', read_only=True)
-    player_team = serializers.CharField(source='player.team_color', read_only=True)
-    video_filename = serializers.CharField(source='video.filename', read_only=True)
-    fg_pct = serializers.SerializerMethodField()
-    fg2_pct = serializers.SerializerMethodField()
-    fg3_pct = serializers.SerializerMethodField()
-    ft_pct = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Stats
-        fields = [
-            'video_filename', 'player_jersey', 'player_team', 'points',
-            'fga_2pt', 'fgm_2pt', 'fg2_pct', 'fga_3pt', 'fgm_3pt', 'fg3_pct',
-            'fta', 'ftm', 'ft_pct', 'fg_pct', 'assists', 'rebounds',
-            'offensive_rebounds', 'defensive_rebounds', 'steals', 'blocks',
-            'turnovers', 'fouls', 'minutes_played', 'plus_minus'
-        ]
-    
-    def get_fg_pct(self, obj):
-        return obj.calculate_shooting_percentages()['fg_pct']
-    
-    def get_fg2_pct(self, obj):
-        return obj.calculate_shooting_percentages()['fg2_pct']
-    
-    def get_fg3_pct(self, obj):
-        return obj.calculate_shooting_percentages()['fg3_pct']
-    
-    def get_ft_pct(self, obj):
-        return obj.calculate_shooting_percentages()['ft_pct'] 
\ No newline at end of file
@@ -3,19 +3,36 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
+from django.db.models import Count, Max, Q, Sum
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 import csv
 import json
-from io import StringIO
+from itertools import chain
 
-from .models import Stats
+from .models import Stats, STATS_EXPORT_FIELDS
 from videos.models import Video
 from .serializers import (
-    StatsSerializer, StatsListSerializer, StatsCreateUpdateSerializer, StatsExportSerializer
+    StatsSerializer, StatsListSerializer, StatsCreateUpdateSerializer, STATS_LIST_FIELDS
 )
 
 
+# Stats fields summed into the team totals of the summary endpoint
+SUMMARY_TOTAL_FIELDS = (
+    'points', 'fga_2pt', 'fgm_2pt', 'fga_3pt', 'fgm_3pt', 'assists',
+    'rebounds', 'steals', 'blocks', 'turnovers', 'fouls'
+)
+
+# Stats whose leading player is reported in the summary
+TOP_PERFORMER_FIELDS = ('points', 'assists', 'rebounds')
+
+
+class Echo:
+    """File-like object whose write() returns the line, so csv.writer output can be streamed"""
+    def write(self, value):
+        return value
+
+
 class StatsViewSet(viewsets.ModelViewSet):
     """ViewSet for Stats operations"""
     permission_classes = [IsAuthenticated]
@@ -34,6 +51,8 @@ class StatsViewSet(viewsets.ModelViewSet):
         if player_id:
             queryset = queryset.filter(player__id=player_id)
         
+        if self.action == 'list':
+            return queryset.select_related('player').only(*STATS_LIST_FIELDS).order_by('-created_at')
         return queryset.select_related('video', 'player').order_by('-created_at')
     
     def get_serializer_class(self):
@@ -53,72 +72,62 @@ class StatsViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            video = Video.objects.get(id=video_id, user=request.user)
-        except Video.DoesNotExist:
+        if not Video.objects.filter(id=video_id, user=request.user).exists():
             return Response(
                 {'error': 'Video not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        stats = Stats.objects.filter(video=video)
-        
-        if not stats.exists():
+        stats = Stats.objects.filter(video_id=video_id)
+        # Team totals and the best value of each top-performer stat in one aggregate query
+        total_stats = stats.aggregate(
+            player_count=Count('id'),
+            **{f'total_{field}': Sum(field) for field in SUMMARY_TOTAL_FIELDS},
+            **{f'max_{field}': Max(field) for field in TOP_PERFORMER_FIELDS}
+        )
+        player_count = total_stats.pop('player_count')
+        best = {field: total_stats.pop(f'max_{field}') for field in TOP_PERFORMER_FIELDS}
+        
+        if not player_count:
             return Response({
                 'message': 'No statistics available for this video',
                 'video_id': video_id
             })
         
-        # Calculate team totals and averages
-        total_stats = {
-            'total_points': sum(s.points for s in stats),
-            'total_fga_2pt': sum(s.fga_2pt for s in stats),
-            'total_fgm_2pt': sum(s.fgm_2pt for s in stats),
-            'total_fga_3pt': sum(s.fga_3pt for s in stats),
-            'total_fgm_3pt': sum(s.fgm_3pt for s in stats),
-            'total_assists': sum(s.assists for s in stats),
-            'total_rebounds': sum(s.rebounds for s in stats),
-            'total_steals': sum(s.steals for s in stats),
-            'total_blocks': sum(s.blocks for s in stats),
-            'total_turnovers': sum(s.turnovers for s in stats),
-            'total_fouls': sum(s.fouls for s in stats),
-        }
-        
         # Calculate team shooting percentages
         team_fg2_pct = (total_stats['total_fgm_2pt'] / total_stats['total_fga_2pt'] * 100) if total_stats['total_fga_2pt'] > 0 else 0
         team_fg3_pct = (total_stats['total_fgm_3pt'] / total_stats['total_fga_3pt'] * 100) if total_stats['total_fga_3pt'] > 0 else 0
         
-        # Top performers
-        top_scorer = stats.order_by('-points').first()
-        top_assists = stats.order_by('-assists').first()
-        top_rebounds = stats.order_by('-rebounds').first()
-        
         summary = {
             'video_id': video_id,
-            'player_count': stats.count(),
+            'player_count': player_count,
             'team_totals': total_stats,
             'team_percentages': {
                 'fg2_pct': round(team_fg2_pct, 1),
                 'fg3_pct': round(team_fg3_pct, 1),
             },
-            'top_performers': {
-                'points': {
-                    'player': f"Player {top_scorer.player.jersey_number}" if top_scorer else None,
-                    'value': top_scorer.points if top_scorer else 0
-                },
-                'assists': {
-                    'player': f"Player {top_assists.player.jersey_number}" if top_assists else None,
-                    'value': top_assists.assists if top_assists else 0
-                },
-                'rebounds': {
-                    'player': f"Player {top_rebounds.player.jersey_number}" if top_rebounds else None,
-                    'value': top_rebounds.rebounds if top_rebounds else 0
-                }
-            }
+            'top_performers': self._top_performers(stats, best)
         }
         
         return Response(summary)
     
+    @staticmethod
+    def _top_performers(stats, best):
+        """Leading player for each stat, fetched in one query from the rows holding a best value"""
+        leaders = Q()
+        for field, value in best.items():
+            leaders |= Q(**{field: value})
+        candidates = list(stats.filter(leaders).values('player__jersey_number', *TOP_PERFORMER_FIELDS))
+        
+        top_performers = {}
+        for field, value in best.items():
+            top = next((row for row in candidates if row[field] == value), None)
+            top_performers[field] = {
+                'player': f"Player {top['player__jersey_number']}" if top else None,
+                'value': value if top else 0
+            }
+        return top_performers
+    
     @action(detail=False, methods=['get'])
     def export(self, request):
         """Export stats to CSV or JSON"""
@@ -131,30 +140,34 @@ class StatsViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            video = Video.objects.get(id=video_id, user=request.user)
-        except Video.DoesNotExist:
+        # Ownership check that only reads the file name
+        video_file = Video.objects.filter(id=video_id, user=request.user).values_list('file', flat=True).first()
+        if video_file is None:
             return Response(
                 {'error': 'Video not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        stats = Stats.objects.filter(video=video).select_related('player')
+        # Same as Video.filename
+        filename = video_file.split('/')[-1] if video_file else None
         
-        if not stats.exists():
+        # Plain row tuples straight from SQL, in STATS_EXPORT_FIELDS order
+        # Top scorers first (backed by the (video, -points) index), id breaks ties
+        rows = Stats.objects.filter(video_id=video_id).order_by('-points', 'id').export_rows(filename)
+        first_row = next(rows, None)
+        
+        if first_row is None:
             return Response(
                 {'error': 'No statistics available for this video'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Serialize data
-        serializer = StatsExportSerializer(stats, many=True)
-        data = serializer.data
+        data = chain([first_row], rows)
         
         if format_type == 'csv':
-            return self._export_csv(data, video.filename or f"video_{video_id}")
+            return self._export_csv(data, filename or f"video_{video_id}")
         elif format_type == 'json':
-            return self._export_json(data, video.filename or f"video_{video_id}")
+            return self._export_json(data, filename or f"video_{video_id}")
         else:
             return Response(
                 {'error': 'Unsupported format. Use csv or json'}, 
@@ -162,20 +175,27 @@ class StatsViewSet(viewsets.ModelViewSet):
             )
     
     def _export_csv(self, data, filename):
-        """Export data as CSV"""
-        output = StringIO()
-        if data:
-            writer = csv.DictWriter(output, fieldnames=data[0].keys())
-            writer.writeheader()
-            writer.writerows(data)
-        
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
+        """Stream data as CSV, one row at a time"""
+        writer = csv.writer(Echo())
+        
+        def csv_rows():
+            yield writer.writerow(STATS_EXPORT_FIELDS)
+            for row in data:
+                yield writer.writerow(row)
+        
+        response = StreamingHttpResponse(csv_rows(), content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="{filename}_stats.csv"'
         return response
     
     def _export_json(self, data, filename):
-        """Export data as JSON"""
-        response = HttpResponse(json.dumps(data, indent=2), content_type='application/json')
+        """Stream data as a JSON array, one row at a time"""
+        def json_rows():
+            yield '['
+            for index, row in enumerate(data):
+                yield (',' if index else '') + json.dumps(dict(zip(STATS_EXPORT_FIELDS, row)))
+            yield ']'
+        
+        response = StreamingHttpResponse(json_rows(), content_type='application/json')
         response['Content-Disposition'] = f'attachment; filename="{filename}_stats.json"'
         return response
 
@@ -186,11 +206,9 @@ class VideoStatsView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        video_id = self.kwargs.get('video_id')
-        return Stats.objects.filter(
-            video__id=video_id, 
-            video__user=self.request.user
-        ).select_related('video', 'player')
+        # Check ownership once, then filter on the indexed video_id column without a JOIN
+        video = get_object_or_404(Video.objects.only('id'), id=self.kwargs.get('video_id'), user=self.request.user)
+        return Stats.objects.filter(video_id=video.id).select_related('player').only(*STATS_LIST_FIELDS)
 
 
 class StatsListView(generics.ListCreateAPIView):
@@ -199,7 +217,10 @@ class StatsListView(generics.ListCreateAPIView):
     filter_backends = [DjangoFilterBackend]
     
     def get_queryset(self):
-        return Stats.objects.filter(video__user=self.request.user).select_related('video', 'player')
+        queryset = Stats.objects.filter(video__user=self.request.user)
+        if self.request.method == 'GET':
+            return queryset.select_related('player').only(*STATS_LIST_FIELDS)
+        return queryset.select_related('video', 'player')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
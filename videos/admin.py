@@ -6,6 +6,7 @@ from .models import Video
 class VideoAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'filename', 'status', 'duration', 'upload_date']
     list_filter = ['status', 'upload_date']
+    list_select_related = ('user',)
     search_fields = ['user__username', 'user__email']
     readonly_fields = ['id', 'upload_date', 'created_at', 'updated_at']
     
@@ -1,3 +1,5 @@
+from functools import cached_property
+
 from django.db import models
 from django.contrib.auth.models import User
 from core.models import BaseModel
@@ -30,10 +32,15 @@ class Video(BaseModel):
     
     class Meta:
         ordering = ['-upload_date']
+        indexes = [
+            # Backs the video__user joins used to scope every per-user listing
+            models.Index(fields=['user', 'id']),
+        ]
         
     def __str__(self):
         return f"Video {self.id} - {self.user.username} - {self.status}"
     
-    @property
+    @cached_property
     def filename(self):
-        return self.file.name.split('/')[-1] if self.file else None 
\ No newline at end of file
+        # Computed once per instance, list responses read it for every row
+        return self.file.name.rsplit('/', 1)[-1] if self.file else None 
\ No newline at end of file
@@ -6,7 +6,7 @@ import os
 
 class VideoListSerializer(serializers.ModelSerializer):
     """Serializer for listing videos with minimal fields"""
-    user = serializers.StringRelatedField(read_only=True)
+    user = serializers.CharField(source='user.username', read_only=True)
     filename = serializers.ReadOnlyField()
     
     class Meta:
@@ -16,7 +16,7 @@ class VideoListSerializer(serializers.ModelSerializer):
 
 class VideoDetailSerializer(serializers.ModelSerializer):
     """Detailed serializer for video with all fields"""
-    user = serializers.StringRelatedField(read_only=True)
+    user = serializers.CharField(source='user.username', read_only=True)
     filename = serializers.ReadOnlyField()
     
     class Meta:
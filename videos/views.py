@@ -5,14 +5,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-import cv2
-from moviepy.editor import VideoFileClip
+from django.utils import timezone
 
 from .models import Video
 from .serializers import (
     VideoListSerializer, VideoDetailSerializer, VideoUploadSerializer, VideoStatusSerializer
 )
-from core.tasks import process_video_task
+from core.tasks import extract_metadata_task, process_video_task
 
 
 class VideoViewSet(viewsets.ModelViewSet):
@@ -20,73 +19,47 @@ class VideoViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status']
+    serializer_classes = {
+        'create': VideoUploadSerializer,
+        'list': VideoListSerializer,
+    }
+    # Parsers are stateless, share one set across requests
+    upload_parsers = [MultiPartParser(), FormParser()]
     
     def get_queryset(self):
-        return Video.objects.filter(user=self.request.user).order_by('-upload_date')
+        return Video.objects.filter(user=self.request.user).select_related('user').order_by('-upload_date')
     
     def get_serializer_class(self):
-        if self.action == 'create':
-            return VideoUploadSerializer
-        elif self.action == 'list':
-            return VideoListSerializer
-        return VideoDetailSerializer
+        return self.serializer_classes.get(self.action, VideoDetailSerializer)
     
     def get_parsers(self):
-        if self.action == 'create':
-            return [MultiPartParser(), FormParser()]
+        # Called while the request is initialized, before self.action is set
+        if self.action_map.get(self.request.method.lower()) == 'create':
+            return self.upload_parsers
         return super().get_parsers()
     
     def perform_create(self, serializer):
-        """Handle video upload and metadata extraction"""
+        """Handle video upload, metadata is extracted in the background"""
         video = serializer.save(user=self.request.user)
-        
-        # Extract video metadata
-        try:
-            self._extract_video_metadata(video)
-        except Exception as e:
-            video.error_message = f"Failed to extract metadata: {str(e)}"
-            video.status = 'error'
-            video.save()
-    
-    def _extract_video_metadata(self, video):
-        """Extract video metadata using OpenCV and MoviePy"""
-        video_path = video.file.path
-        
-        # Use OpenCV for basic properties
-        cap = cv2.VideoCapture(video_path)
-        if cap.isOpened():
-            video.fps = cap.get(cv2.CAP_PROP_FPS)
-            video.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            video.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-            video.duration = frame_count / video.fps if video.fps > 0 else 0
-            cap.release()
-        
-        # Use MoviePy for duration verification
-        try:
-            clip = VideoFileClip(video_path)
-            video.duration = clip.duration
-            clip.close()
-        except Exception:
-            pass  # Use OpenCV duration if MoviePy fails
-        
-        video.save()
+        extract_metadata_task.delay(str(video.id))
     
     @action(detail=True, methods=['post'])
     def process(self, request, pk=None):
         """Start video processing"""
-        video = self.get_object()
+        # Move uploaded -> processing in one conditional UPDATE so a video is only queued once
+        started = self.get_queryset().filter(pk=pk, status='uploaded').update(
+            status='processing', updated_at=timezone.now()
+        )
         
-        if video.status != 'uploaded':
+        if not started:
+            self.get_object()  # 404 if the video does not exist
             return Response(
                 {'error': 'Video can only be processed from uploaded status'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Start async processing
-        process_video_task.delay(video.id)
-        video.status = 'processing'
-        video.save()
+        process_video_task.delay(str(pk))
         
         return Response({'message': 'Video processing started'})
     
@@ -109,26 +82,7 @@ class VideoUploadView(generics.CreateAPIView):
         video = serializer.save(user=self.request.user)
         
         # Extract metadata in background
-        try:
-            self._extract_video_metadata(video)
-        except Exception as e:
-            video.error_message = f"Metadata extraction failed: {str(e)}"
-            video.save()
-    
-    def _extract_video_metadata(self, video):
-        """Extract video metadata"""
-        video_path = video.file.path
-        
-        cap = cv2.VideoCapture(video_path)
-        if cap.isOpened():
-            video.fps = cap.get(cv2.CAP_PROP_FPS)
-            video.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            video.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
-            video.duration = frame_count / video.fps if video.fps > 0 else 0
-            cap.release()
-        
-        video.save()
+        extract_metadata_task.delay(str(video.id))
 
 
 class VideoProcessView(generics.GenericAPIView):
@@ -143,26 +97,25 @@ class VideoProcessView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            video = Video.objects.get(id=video_id, user=request.user)
-        except Video.DoesNotExist:
-            return Response(
-                {'error': 'Video not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
+        videos = Video.objects.filter(id=video_id, user=request.user)
+        # Move uploaded -> processing in one conditional UPDATE so a video is only queued once
+        started = videos.filter(status='uploaded').update(status='processing', updated_at=timezone.now())
         
-        if video.status != 'uploaded':
+        if not started:
+            if not videos.exists():
+                return Response(
+                    {'error': 'Video not found'}, 
+                    status=status.HTTP_404_NOT_FOUND
+                )
             return Response(
                 {'error': 'Video must be in uploaded status'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Start processing
-        process_video_task.delay(str(video.id))
-        video.status = 'processing'
-        video.save()
+        process_video_task.delay(str(video_id))
         
-        return Response({'message': 'Processing started', 'video_id': video.id})
+        return Response({'message': 'Processing started', 'video_id': video_id})
 
 
 class VideoStatusView(generics.RetrieveAPIView):